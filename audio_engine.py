@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+import mmap
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import startup_profile
+from audio_processing import choose_capture_format
+from config import env_float
+
+# Audio from just before the trigger that is prepended to each recording
+PREROLL_SECONDS = env_float("PREROLL_SECONDS", 0.5)
+
+# Capture buffer sized for this much audio up front
+INITIAL_CAPTURE_SECONDS = 30
+# Recordings bigger than this move to a memory-mapped temp file
+CAPTURE_SPILL_BYTES = int(env_float("CAPTURE_SPILL_MB", 32) * 1024 * 1024)
+
+
+class RingBuffer:
+    """Fixed-size circular byte buffer; writes copy into preallocated memory"""
+
+    def __init__(self, size):
+        self.size = size
+        self.buffer = np.zeros(size, dtype=np.uint8)
+        self.pos = 0
+        self.filled = 0
+
+    def write(self, data):
+        """Append bytes, overwriting the oldest audio once full"""
+        src = np.frombuffer(data, dtype=np.uint8)
+        if len(src) >= self.size:
+            self.buffer[:] = src[-self.size:]
+            self.pos = 0
+            self.filled = self.size
+            return
+        end = self.pos + len(src)
+        if end <= self.size:
+            self.buffer[self.pos:end] = src
+        else:
+            first = self.size - self.pos
+            self.buffer[self.pos:] = src[:first]
+            self.buffer[:end - self.size] = src[first:]
+        self.pos = end % self.size
+        self.filled = min(self.size, self.filled + len(src))
+
+    def latest(self, n=None):
+        """Return (up to) the last n bytes written, oldest first"""
+        n = self.filled if n is None else min(n, self.filled)
+        start = (self.pos - n) % self.size
+        if start + n <= self.size:
+            return self.buffer[start:start + n].tobytes()
+        return self.buffer[start:].tobytes() + self.buffer[:start + n - self.size].tobytes()
+
+    def clear(self):
+        self.pos = 0
+        self.filled = 0
+
+
+class CaptureBuffer:
+    """Growable, preallocated byte buffer for one recording
+
+    Chunks are copied into spare capacity instead of being kept as separate
+    bytes objects, and capacity doubles when it runs out. Past ``spill_bytes``
+    the audio moves to a memory-mapped temporary file so long sessions don't
+    sit in the heap. ``view`` hands the audio on without copying it.
+    """
+
+    def __init__(self, initial_bytes, spill_bytes=CAPTURE_SPILL_BYTES):
+        self.spill_bytes = spill_bytes
+        self.data = bytearray(initial_bytes)
+        self.length = 0
+        self.file = None
+
+    def __len__(self):
+        return self.length
+
+    def _grow(self, needed):
+        """Make room for at least ``needed`` bytes"""
+        capacity = max(needed, 2 * len(self.data))
+        if self.file is None and capacity <= self.spill_bytes:
+            self.data.extend(bytes(capacity - len(self.data)))
+            return
+
+        if self.file is None:
+            self.file = tempfile.TemporaryFile(prefix="capture-")
+            self.file.truncate(capacity)
+            mapped = mmap.mmap(self.file.fileno(), capacity)
+            mapped[:self.length] = self.data[:self.length]
+            self.data = mapped
+        else:
+            self.file.truncate(capacity)
+            self.data.resize(capacity)
+
+    def append(self, chunk):
+        end = self.length + len(chunk)
+        if end > len(self.data):
+            self._grow(end)
+        self.data[self.length:end] = chunk
+        self.length = end
+
+    def view(self):
+        """Zero-copy view of the recorded bytes"""
+        return memoryview(self.data)[:self.length]
+
+    def copy(self, num_bytes):
+        """Copy of the first ``num_bytes``; a view would stop the buffer growing"""
+        return bytes(self.data[:min(num_bytes, self.length)])
+
+
+class AudioEngine:
+    """Long-lived PortAudio instance with an input stream kept open between recordings
+
+    PortAudio initialisation and ALSA device probing happen once in ``open``
+    (or again in ``refresh`` after a hotplug or device error). Capture runs in
+    PortAudio's callback thread; with a pre-roll window configured the stream
+    never stops and feeds a ring buffer, so the moment before the trigger is
+    already captured when ``start`` is called.
+    """
+
+    def __init__(self, input_device_index=None, sample_rate=48000, channels=2, chunk=1024,
+                 preroll_seconds=PREROLL_SECONDS):
+        self.requested_device = input_device_index
+        self.requested_rate = sample_rate
+        self.requested_channels = channels
+        self.chunk = chunk
+        self.sample_width = 2  # paInt16
+        self.preroll_seconds = preroll_seconds
+        self.pyaudio = None
+        self.p = None
+        self.stream = None
+        self.devices = []
+        self.input_device_index = None
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.ring = None
+        self.lock = threading.Lock()
+        self.recording = False
+        self.buffer = None
+        self.on_chunk = None
+        self.skip_bytes = 0
+        self.first_frame_at = None  # perf_counter time the recording got its first audio
+
+    def open(self):
+        """Initialise PortAudio, enumerate devices and open a paused input stream"""
+        # Imported here so entry points don't pay for it before they need audio
+        with startup_profile.phase("import pyaudio"):
+            import pyaudio
+        self.pyaudio = pyaudio
+
+        with startup_profile.phase("PortAudio init"):
+            self.p = pyaudio.PyAudio()
+        with startup_profile.phase("device probe"):
+            self.devices = []
+            for i in range(self.p.get_device_count()):
+                dev_info = self.p.get_device_info_by_index(i)
+                if dev_info.get('maxInputChannels') > 0:  # Only input devices
+                    self.devices.append((i, dev_info))
+
+        self.input_device_index = self.requested_device
+        if self.input_device_index is None and self.devices:
+            self.input_device_index = self.devices[0][0]
+
+        try:
+            device_info = self.p.get_device_info_by_index(self.input_device_index)
+            print(f"\nDevice Info for index {self.input_device_index}:")
+            print(f"Name: {device_info.get('name')}")
+            print(f"Max Input Channels: {device_info.get('maxInputChannels')}")
+            print(f"Default Sample Rate: {device_info.get('defaultSampleRate')}")
+        except Exception as e:
+            print(f"Error getting device info: {e}")
+
+        # Capture straight at the upload format when the device allows it
+        with startup_profile.phase("format probe"):
+            self.sample_rate, self.channels = choose_capture_format(
+                self.p, self.input_device_index, self.requested_rate, self.requested_channels
+            )
+        print(f"Capturing at {self.sample_rate}Hz, {self.channels} channel(s)")
+
+        with startup_profile.phase("open stream"):
+            self.stream = self.p.open(
+                format=pyaudio.paInt16,
+                channels=self.channels,
+                rate=self.sample_rate,
+                input=True,
+                frames_per_buffer=self.chunk,
+                input_device_index=self.input_device_index,
+                stream_callback=self._callback,
+                start=False,
+            )
+
+        frame_bytes = self.channels * self.sample_width
+        preroll_bytes = int(self.preroll_seconds * self.sample_rate) * frame_bytes
+        self.ring = RingBuffer(preroll_bytes) if preroll_bytes else None
+        if self.ring is not None:
+            # Always listening so the pre-roll window is full when the trigger fires
+            self.stream.start_stream()
+        return self
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """PortAudio capture callback: feed the ring and the active recording"""
+        if status:
+            print(f"Warning: PortAudio input status {status}")
+        with self.lock:
+            if self.ring is not None:
+                self.ring.write(in_data)
+            if self.recording and self.skip_bytes:
+                # Still inside the start cue; drop it from the recording
+                skipped = min(self.skip_bytes, len(in_data))
+                self.skip_bytes -= skipped
+                in_data = in_data[skipped:]
+            if self.recording and in_data:
+                if self.first_frame_at is None:
+                    self.first_frame_at = time.perf_counter()
+                self.buffer.append(in_data)
+                if self.on_chunk is not None:
+                    self.on_chunk(in_data)
+        return (None, self.pyaudio.paContinue)
+
+    def close(self):
+        """Close the stream and release PortAudio"""
+        if self.stream is not None:
+            try:
+                self.stream.close()
+            except Exception as e:
+                print(f"Warning: Error closing stream: {e}")
+            self.stream = None
+        if self.p is not None:
+            self.p.terminate()
+            self.p = None
+
+    def refresh(self):
+        """Re-probe devices and reopen the stream, e.g. after a hotplug"""
+        print("Re-initialising audio engine...")
+        self.close()
+        return self.open()
+
+    def device_name(self):
+        """Name of the input device in use, or None"""
+        for i, info in self.devices:
+            if i == self.input_device_index:
+                return info.get('name')
+        return None
+
+    def list_devices(self):
+        """Print the input devices found when the engine was opened"""
+        print("\nAvailable Audio Input Devices:")
+        print("-" * 60)
+        for i, info in self.devices:
+            print(f"Index {i}: {info.get('name')}")
+        print("-" * 60)
+        return [info for _, info in self.devices]
+
+    def start(self, on_chunk=None, skip_seconds=0.0):
+        """Begin a recording, seeded with the pre-roll window
+
+        ``on_chunk``, if given, is called from the capture thread with every
+        chunk recorded from here on (including the pre-roll). ``skip_seconds``
+        of audio after the trigger are dropped instead, along with the
+        pre-roll, so a cue played as capture starts stays out of the recording.
+        """
+        if self.stream is None:
+            self.open()
+        frame_bytes = self.channels * self.sample_width
+        buffer = CaptureBuffer(INITIAL_CAPTURE_SECONDS * self.sample_rate * frame_bytes)
+        with self.lock:
+            self.buffer = buffer
+            self.on_chunk = on_chunk
+            self.skip_bytes = int(skip_seconds * self.sample_rate) * frame_bytes
+            self.first_frame_at = None
+            if self.ring is not None and self.ring.filled and not self.skip_bytes:
+                preroll = self.ring.latest()
+                self.first_frame_at = time.perf_counter()
+                self.buffer.append(preroll)
+                if on_chunk is not None:
+                    on_chunk(preroll)
+            self.recording = True
+        if self.stream.is_stopped():
+            self.stream.start_stream()
+
+    def stop(self):
+        """End the recording and return a memoryview of its PCM"""
+        with self.lock:
+            self.recording = False
+            self.on_chunk = None
+            buffer = self.buffer
+            self.buffer = None
+        # Without pre-roll there is no reason to keep capturing between recordings
+        if self.ring is None and self.stream is not None and self.stream.is_active():
+            self.stream.stop_stream()
+        if buffer is None:
+            return memoryview(b"")
+        return buffer.view()
+
+    def snapshot(self, num_bytes):
+        """Copy of the first ``num_bytes`` of the recording in progress, or None once it has stopped
+
+        Taken under the capture lock, so it can run on any thread while
+        capture continues.
+        """
+        with self.lock:
+            if self.buffer is None:
+                return None
+            return self.buffer.copy(num_bytes)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
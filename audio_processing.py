@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+from math import gcd
+
+import numpy as np
+
+from config import env_int
+
+# Whisper works on 16 kHz mono internally, so anything more is wasted upload
+TARGET_SAMPLE_RATE = env_int("UPLOAD_SAMPLE_RATE", 16000)
+TARGET_CHANNELS = env_int("UPLOAD_CHANNELS", 1)
+
+# Resampling blocks are processed this many output samples at a time
+RESAMPLE_BLOCK = 32768
+
+
+def pcm_to_array(data, channels):
+    """View interleaved 16-bit PCM as a (samples, channels) int16 array"""
+    samples = np.frombuffer(data, dtype=np.int16)
+    samples = samples[:len(samples) - (len(samples) % channels)]
+    return samples.reshape(-1, channels)
+
+
+def array_to_pcm(samples):
+    """Convert float samples back to interleaved 16-bit PCM bytes"""
+    return np.clip(np.rint(samples), -32768, 32767).astype(np.int16).tobytes()
+
+
+def downmix(samples, channels=1):
+    """Average a (samples, channels) array down to the requested channel count"""
+    if samples.shape[1] == channels:
+        return samples.astype(np.float32)
+    mono = samples.mean(axis=1, dtype=np.float32)
+    if channels == 1:
+        return mono[:, None]
+    return np.repeat(mono[:, None], channels, axis=1)
+
+
+def _lowpass_filter(up, down):
+    """Kaiser-windowed sinc anti-aliasing filter for a rational rate change"""
+    max_rate = max(up, down)
+    cutoff = 1.0 / max_rate
+    half_len = 10 * max_rate
+    n = np.arange(-half_len, half_len + 1)
+    taps = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), 5.0)
+    taps /= taps.sum()
+    return taps * up, half_len
+
+
+def resample_poly(signal, up, down):
+    """Resample a 1-D signal by up/down using a polyphase FIR filter
+
+    Only the output samples that are actually kept are computed: each one is
+    the dot product of one filter phase with the matching input window.
+    """
+    g = gcd(up, down)
+    up, down = up // g, down // g
+    signal = np.asarray(signal, dtype=np.float32)
+    if up == down or len(signal) == 0:
+        return signal
+
+    taps, half_len = _lowpass_filter(up, down)
+    phase_len = -(-len(taps) // up)
+    padded_taps = np.zeros(phase_len * up, dtype=np.float32)
+    padded_taps[:len(taps)] = taps
+    # phases[p, j] is the tap applied to input sample (i - j) for output phase p
+    phases = padded_taps.reshape(phase_len, up).T
+
+    n_out = -(-len(signal) * up // down)
+    padded = np.concatenate([
+        np.zeros(phase_len - 1, dtype=np.float32),
+        signal,
+        np.zeros(phase_len + half_len // up + 1, dtype=np.float32),
+    ])
+    offsets = np.arange(phase_len)
+
+    output = np.empty(n_out, dtype=np.float32)
+    for start in range(0, n_out, RESAMPLE_BLOCK):
+        m = np.arange(start, min(start + RESAMPLE_BLOCK, n_out))
+        n = m * down + half_len
+        newest = n // up + (phase_len - 1)
+        windows = padded[newest[:, None] - offsets]
+        output[start:start + len(m)] = np.einsum("ij,ij->i", windows, phases[n % up])
+    return output
+
+
+def preprocess_pcm(data, sample_rate, channels,
+                   target_rate=TARGET_SAMPLE_RATE, target_channels=TARGET_CHANNELS):
+    """Downmix and resample raw PCM to the upload format
+
+    Returns (pcm, sample_rate, channels); audio already in the upload format
+    is passed through as-is, without a copy.
+    """
+    if sample_rate == target_rate and channels == target_channels:
+        return data, sample_rate, channels
+
+    samples = downmix(pcm_to_array(data, channels), min(channels, target_channels))
+    if sample_rate != target_rate:
+        samples = np.stack(
+            [resample_poly(samples[:, c], target_rate, sample_rate) for c in range(samples.shape[1])],
+            axis=1,
+        )
+    return array_to_pcm(samples), target_rate, samples.shape[1]
+
+
+def choose_capture_format(p, input_device_index, sample_rate, channels,
+                          target_rate=TARGET_SAMPLE_RATE, target_channels=TARGET_CHANNELS):
+    """Open the device at the upload format directly when it supports it"""
+    import pyaudio
+
+    try:
+        if p.is_format_supported(
+            target_rate,
+            input_device=input_device_index,
+            input_channels=target_channels,
+            input_format=pyaudio.paInt16,
+        ):
+            return target_rate, target_channels
+    except ValueError:
+        pass
+    return sample_rate, channels
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Transcribe existing audio files in bulk: batch_transcribe.py PATH... -o transcripts.jsonl
+
+PATH is a directory (searched recursively for WAV/FLAC/MP3/Ogg files), a
+manifest listing one file per line, or a single audio file. Results are
+appended to the JSONL output as each file finishes, and the output doubles
+as the checkpoint: rerunning the same command skips files already done and
+retries the ones that failed.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from audio_processing import preprocess_pcm
+from config import env_int
+from engines import create_engine
+from groq_client import create_client
+from vad import apply_vad
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".ogg", ".opus")
+
+BATCH_WORKERS = env_int("BATCH_WORKERS", 4)
+
+# Statuses that count as done when resuming
+DONE_STATUSES = ("ok", "no_speech")
+
+client = None
+
+
+def get_client():
+    """Groq client, created on first use"""
+    global client
+    if client is None:
+        client = create_client()
+    return client
+
+
+def find_audio_files(paths):
+    """Expand directories and manifests into a sorted, de-duplicated list of audio files"""
+    found = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                found.extend(os.path.join(root, n) for n in names if n.lower().endswith(AUDIO_EXTENSIONS))
+        elif path.lower().endswith(AUDIO_EXTENSIONS):
+            found.append(path)
+        else:
+            # Manifest: one path per line, relative to the manifest; # starts a comment
+            base = os.path.dirname(path)
+            with open(path) as manifest:
+                for line in manifest:
+                    line = line.split("#")[0].strip()
+                    if line:
+                        found.append(os.path.join(base, os.path.expanduser(line)))
+    return sorted(set(os.path.abspath(p) for p in found))
+
+
+def load_audio(path):
+    """Decode a file to 16-bit PCM; returns (pcm, sample_rate, channels)"""
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as wf:
+            if wf.getsampwidth() == 2:
+                return wf.readframes(wf.getnframes()), wf.getframerate(), wf.getnchannels()
+    try:
+        import soundfile
+    except ImportError:
+        raise RuntimeError("decoding non-16-bit WAV, FLAC, MP3 or Ogg needs the soundfile package")
+    samples, sample_rate = soundfile.read(path, dtype="int16", always_2d=True)
+    return samples.tobytes(), sample_rate, samples.shape[1]
+
+
+def load_checkpoint(output):
+    """Files already transcribed according to an existing JSONL output"""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A line cut short by an interruption
+            if record.get("status") in DONE_STATUSES:
+                done.add(record["path"])
+    return done
+
+
+class BatchTranscriber:
+    """Transcribe files on a bounded worker pool, appending one JSON line per file"""
+
+    def __init__(self, output, workers=BATCH_WORKERS):
+        self.output = output
+        self.workers = max(1, workers)
+        self.router = create_engine(get_client)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def _write(self, record):
+        with self.lock:
+            with open(self.output, "a") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.counts[record["status"]] = self.counts.get(record["status"], 0) + 1
+
+    def process(self, path):
+        start = time.time()
+        record = {"path": path}
+        try:
+            pcm, sample_rate, channels = load_audio(path)
+            record["seconds"] = round(len(pcm) / (sample_rate * channels * 2), 2)
+            pcm, sample_rate, channels = preprocess_pcm(pcm, sample_rate, channels)
+            pcm = apply_vad(pcm, sample_rate, channels)
+            if pcm is None:
+                record.update(status="no_speech", text="")
+            else:
+                # Rate limits and retries are handled by the Groq engine's scheduler
+                text = self.router.transcribe(pcm, sample_rate, channels, raise_errors=True)
+                record.update(status="ok" if text else "empty", text=text or "")
+        except Exception as e:
+            record.update(status="error", error=str(e))
+        record["elapsed"] = round(time.time() - start, 3)
+        self._write(record)
+        return record
+
+    def run(self, files):
+        done = load_checkpoint(self.output)
+        todo = [path for path in files if path not in done]
+        print(f"{len(files)} files, {len(files) - len(todo)} already done, {len(todo)} to transcribe")
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as executor:
+            for index, record in enumerate(executor.map(self.process, todo), 1):
+                print(f"[{index}/{len(todo)}] {record['status']}: {record['path']}")
+        elapsed = time.time() - start
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(self.counts.items()))
+        print(f"Finished in {elapsed:.1f}s: {summary or 'nothing to do'}")
+        cache = self.router.cache
+        if cache is not None:
+            print(f"Cache: {cache.stats()}")
+        # Request latencies only; batch files are not dictations with a trigger
+        metrics.export()
+        return self.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="Audio files, directories or manifests")
+    parser.add_argument("-o", "--output", default="transcripts.jsonl", help="JSONL results and checkpoint")
+    parser.add_argument("-j", "--workers", type=int, default=BATCH_WORKERS, help="Files transcribed at once")
+    args = parser.parse_args()
+
+    files = find_audio_files(args.paths)
+    counts = BatchTranscriber(args.output, args.workers).run(files)
+    return 1 if counts.get("error") else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
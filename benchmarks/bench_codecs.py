@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Compare encode time and upload size for each upload codec
+
+Run from the repository root:
+
+    python benchmarks/bench_codecs.py --seconds 120 --uplink-kbps 250
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from encoders import ENCODERS, available_codecs, choose_codec  # noqa: E402
+
+
+def synthetic_speech(seconds, sample_rate=16000, seed=0):
+    """Speech-like 16-bit mono PCM: voiced harmonics with syllable-rate bursts and pauses"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    pauses = (np.sin(2 * np.pi * 0.2 * t) > -0.6).astype(np.float32)
+    noise = rng.normal(0, 0.05, len(t))
+    signal = (voiced * syllables * pauses + noise) * 6000
+    return np.clip(signal, -32768, 32767).astype(np.int16).tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=120.0)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--uplink-kbps", type=float, default=250.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pcm = synthetic_speech(args.seconds, args.sample_rate)
+    uplink = args.uplink_kbps * 1024
+    print(f"{args.seconds:.0f}s of 16-bit mono at {args.sample_rate}Hz: {len(pcm)} bytes of PCM")
+    print(f"Uplink assumed at {args.uplink_kbps:.0f} KB/s")
+    print("-" * 72)
+    print(f"{'codec':<8}{'bytes':>12}{'ratio':>8}{'encode ms':>12}{'upload s':>12}{'total s':>12}")
+
+    for codec in available_codecs(args.sample_rate):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            data = ENCODERS[codec](pcm, args.sample_rate, 1)
+            timings.append(time.perf_counter() - start)
+        encode = min(timings)
+        upload = len(data) / uplink
+        print(f"{codec:<8}{len(data):>12}{len(data) / len(pcm):>8.3f}"
+              f"{encode * 1000:>12.1f}{upload:>12.2f}{encode + upload:>12.2f}")
+
+    print("-" * 72)
+    chosen = choose_codec(len(pcm), args.seconds, uplink, available_codecs(args.sample_rate))
+    print(f"Auto policy picks: {chosen}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Measure cold versus pooled, pre-warmed API connection latency offline
+
+Starts a local fake transcription server and times the same upload with a
+fresh client per request (DNS + TCP + TLS every time, like the one-shot
+recorder) and with one pooled client that was pre-warmed first.
+
+    python benchmarks/bench_connection.py --requests 20 --latency 0.05 --handshake 0.15
+    python benchmarks/bench_connection.py --certfile cert.pem --keyfile key.pem
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_groq_server import serve  # noqa: E402
+from encoders import encode_wav  # noqa: E402
+from groq_client import create_client, create_http_client, prewarm  # noqa: E402
+
+
+def transcribe(client, upload):
+    start = time.perf_counter()
+    client.audio.transcriptions.create(
+        file=upload, model="whisper-large-v3-turbo", response_format="text", language="en",
+    )
+    return time.perf_counter() - start
+
+
+def summarise(label, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+    print(f"{label:<8}{statistics.median(timings) * 1000:>10.1f}{p95 * 1000:>10.1f}{timings[0] * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated inference seconds")
+    parser.add_argument("--handshake", type=float, default=0.15,
+                        help="Simulated DNS + TCP + TLS seconds per new connection")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Audio length per upload")
+    parser.add_argument("--certfile", help="Serve over TLS with this certificate")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args()
+
+    server = serve(latency=args.latency, handshake=args.handshake,
+                   certfile=args.certfile, keyfile=args.keyfile)
+    verify = args.certfile or True
+    pcm = bytes(int(args.seconds * 16000) * 2)
+    upload = ("recording.wav", encode_wav(pcm, 16000, 1))
+
+    def new_client():
+        return create_client("fake", server.base_url, create_http_client(verify=verify))
+
+    cold = []
+    for _ in range(args.requests):
+        client = new_client()
+        cold.append(transcribe(client, upload))
+        client.close()
+
+    client = new_client()
+    prewarm(client, wait=True, force=True)
+    warm = [transcribe(client, upload) for _ in range(args.requests)]
+    client.close()
+
+    print(f"Fake server at {server.base_url}, {args.latency * 1000:.0f} ms simulated inference, "
+          f"{args.handshake * 1000:.0f} ms per new connection")
+    print(f"{'':<8}{'p50 ms':>10}{'p95 ms':>10}{'min ms':>10}")
+    summarise("cold", cold)
+    summarise("warm", warm)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Hermetic end-to-end benchmark: fake microphone to text, time-to-text, CPU and memory
+
+Synthetic speech-like audio (syllables built with generate_sounds.py's sine
+and envelope generators, separated by word and sentence pauses) is captured
+by the real AudioEngine through benchmarks/fake_pyaudio.py, then
+preprocessed, trimmed, encoded and transcribed against a local fake Groq
+server with simulated latency and uplink bandwidth. Each recording length
+runs in a fresh interpreter so CPU time and peak RSS are its own.
+
+    python benchmarks/bench_end_to_end.py --seconds 1 30 120 --runs 5
+    python benchmarks/bench_end_to_end.py --latency 0.5 --bandwidth-kbps 250 --json > before.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from generate_sounds import apply_envelope, generate_sine_wave  # noqa: E402
+
+# Stages shown in the table, from metrics.STAGES
+REPORTED_STAGES = ("encode", "inference")
+
+
+def speech_like(seconds, sample_rate, channels, seed=0):
+    """16-bit PCM of voiced syllables with word and sentence pauses, ``seconds`` long"""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    signal = np.zeros(total)
+    position = int(0.2 * sample_rate)
+    while position < total:
+        # A word of one to three syllables
+        for _ in range(rng.integers(1, 4)):
+            if position >= total:
+                break
+            duration = rng.uniform(0.12, 0.3)
+            pitch = rng.uniform(100, 250)
+            syllable = sum(generate_sine_wave(pitch * h, duration, sample_rate, amplitude=0.5 / h) for h in (1, 2, 3))
+            syllable = apply_envelope(syllable, sample_rate, attack=0.02, decay=0.05)
+            end = min(total, position + len(syllable))
+            signal[position:end] += syllable[:end - position] * rng.uniform(0.3, 0.6)
+            position = end + int(rng.uniform(0.02, 0.06) * sample_rate)
+        # Usually a short gap between words, now and then a sentence break
+        pause = rng.uniform(0.6, 1.0) if rng.random() < 0.15 else rng.uniform(0.1, 0.3)
+        position += int(pause * sample_rate)
+    samples = np.int16(np.clip(signal, -1, 1) * 32767)
+    return np.repeat(samples[:, None], channels, axis=1).tobytes()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run_child(args):
+    """Run every recording of one length in this process and print the results as JSON"""
+    import resource
+
+    from benchmarks import fake_pyaudio
+    sys.modules["pyaudio"] = fake_pyaudio
+    fake_pyaudio.device.speed = args.speed
+
+    import metrics
+    from audio_engine import AudioEngine
+    from audio_processing import preprocess_pcm
+    from engines import create_engine
+    from groq_client import create_client, prewarm
+    from vad import apply_vad
+
+    client = create_client("fake", args.base_url)
+    prewarm(client, wait=True, force=True)
+    router = create_engine(lambda: client, "groq")
+    engine = AudioEngine(input_device_index=0).open()
+    device = fake_pyaudio.device
+
+    clips = [speech_like(args.seconds, device.rate, device.channels, seed) for seed in range(args.runs)]
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    cpu_start = time.process_time()
+    records = []
+    for clip in clips:
+        trace = metrics.Trace("benchmark")
+        trace.mark("trigger")
+        engine.start()
+        device.play(clip)
+        device.drained.wait()
+        audio = engine.stop()
+        trace.mark("stop")
+        trace.mark("first_frame", engine.first_frame_at)
+        trace.audio_seconds = len(audio) / (engine.sample_rate * engine.channels * 2)
+        with trace.active():
+            pcm, sample_rate, channels = preprocess_pcm(audio, engine.sample_rate, engine.channels)
+            pcm = apply_vad(pcm, sample_rate, channels)
+            text = router.transcribe(pcm, sample_rate, channels) if pcm is not None else None
+        records.append(trace.finish(delivered=bool(text)))
+    cpu = time.process_time() - cpu_start
+    engine.close()
+
+    print(json.dumps({
+        "seconds": args.seconds,
+        "records": records,
+        "cpu_seconds_per_run": cpu / max(1, args.runs),
+        # ru_maxrss is in kilobytes on Linux
+        "baseline_rss_mb": baseline_rss / 1024,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def run_length(seconds, base_url, args):
+    """One recording length in a fresh interpreter, with a clean config and working directory"""
+    command = [sys.executable, os.path.abspath(__file__), "--child", "--seconds", str(seconds),
+               "--runs", str(args.runs), "--speed", str(args.speed), "--base-url", base_url]
+    env = dict(
+        os.environ,
+        GROQ_API_KEY="fake",
+        TRANSCRIPTION_ENGINE="groq",
+        TRANSCRIPTION_CACHE="false",  # Every run uploads, even of repeated audio
+        GROQ_REQUESTS_PER_MINUTE="0",
+        GROQ_AUDIO_SECONDS_PER_HOUR="0",
+        ARCHIVE_AUDIO_DIR="",
+        METRICS_JSONL="",
+        METRICS_PROMETHEUS_FILE="",
+    )
+    # Upload estimates are written to the working directory; keep it out of the repo
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"{seconds}s run failed:\n{result.stderr}")
+    # The results are the last line; anything before it is the pipeline's own output
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def report(results):
+    stage_headers = "".join(f"{stage + ' p50':>16}" for stage in REPORTED_STAGES)
+    print(f"{'audio s':>8}{'runs':>6}{'ttt p50 ms':>12}{'ttt p95 ms':>12}{stage_headers}"
+          f"{'CPU s/run':>11}{'peak RSS MB':>13}{'upload KB':>11}")
+    for result in results:
+        records = result["records"]
+        ttt = [r["stages_ms"].get("time_to_text", 0.0) for r in records]
+        stages = "".join(
+            f"{percentile([r['stages_ms'].get(stage, 0.0) for r in records], 0.5):>16.1f}"
+            for stage in REPORTED_STAGES
+        )
+        upload = percentile([r["upload_bytes"] for r in records], 0.5) / 1024
+        print(f"{result['seconds']:>8g}{len(records):>6}{percentile(ttt, 0.5):>12.1f}{percentile(ttt, 0.95):>12.1f}"
+              f"{stages}{result['cpu_seconds_per_run']:>11.3f}{result['peak_rss_mb']:>13.1f}{upload:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, nargs="+", default=[1, 30, 120], help="Recording lengths")
+    parser.add_argument("--runs", type=int, default=5, help="Recordings per length")
+    parser.add_argument("--latency", type=float, default=0.3, help="Simulated inference seconds per request")
+    parser.add_argument("--bandwidth-kbps", type=float, default=500, help="Simulated uplink, 0 for unlimited")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="Capture speed as a multiple of real time, 0 for as fast as possible")
+    parser.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.seconds = args.seconds[0]
+        run_child(args)
+        return
+
+    from benchmarks.fake_groq_server import serve
+    server = serve(latency=args.latency, bandwidth=args.bandwidth_kbps * 1024 or None)
+    try:
+        results = [run_length(seconds, server.base_url, args) for seconds in args.seconds]
+    finally:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print(f"Fake server: {args.latency * 1000:.0f} ms inference, "
+              f"{args.bandwidth_kbps or 'unlimited'} KB/s uplink; time-to-text (ttt) is stop to text")
+        report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Check that bursts of transcriptions survive rate limits and server errors
+
+Fires concurrent transcriptions at a local fake server that enforces a
+request rate (answering 429 with Retry-After) and fails a few requests with
+5xx errors, once with a bare single attempt per request and once through
+rate_limiter.RequestScheduler. The window is scaled down so a run takes
+seconds rather than minutes.
+
+    python benchmarks/bench_rate_limits.py --requests 30 --limit 5 --window 2
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_groq_server import serve  # noqa: E402
+from encoders import encode_wav  # noqa: E402
+from groq_client import create_client  # noqa: E402
+from rate_limiter import RequestScheduler, TokenBucket  # noqa: E402
+
+
+def run(label, scheduler, args):
+    faults = [(500, {}), (503, {})] * args.errors
+    server = serve(latency=args.latency, faults=faults, rate_limit=args.limit, rate_window=args.window)
+    client = create_client("fake", server.base_url)
+    upload = ("recording.wav", encode_wav(bytes(16000 * 2 * 3), 16000, 1))
+
+    def transcribe(_):
+        start = time.perf_counter()
+        try:
+            scheduler.run(lambda: client.audio.transcriptions.create(
+                file=upload, model="whisper-large-v3-turbo", response_format="text", language="en",
+            ), audio_seconds=3)
+            return time.perf_counter() - start
+        except Exception:
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(transcribe, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    done = sorted(r for r in results if r is not None)
+    worst = done[-1] if done else 0
+    print(f"{label:<12}{len(done):>5}/{args.requests:<5}{server.rejected:>10}{worst:>12.2f}{elapsed:>10.2f}")
+    return len(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=5, help="Requests the server accepts per window")
+    parser.add_argument("--window", type=float, default=2.0, help="Rate limit window in seconds")
+    parser.add_argument("--errors", type=int, default=2, help="Pairs of 500/503 responses to inject")
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    print(f"{'':<12}{'done':>11}{'429s':>10}{'slowest s':>12}{'total s':>10}")
+    run("no retries", RequestScheduler(0, 0, attempts=1), args)
+    scheduler = RequestScheduler(0, 0, attempts=8, backoff=0.1)
+    # The same budget as the server, scaled down to its window
+    scheduler.requests = TokenBucket(args.limit / args.window, args.limit)
+    completed = run("scheduler", scheduler, args)
+    return 0 if completed == args.requests else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
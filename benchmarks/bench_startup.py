@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Cold-start regression check for the entry points
+
+Launches an entry point with --profile-startup --json in fresh interpreters,
+reports the median per-phase timings and exits non-zero when the median total
+exceeds the budget, so it can gate changes in CI.
+
+    python benchmarks/bench_startup.py --budget-ms 1500
+    python benchmarks/bench_startup.py --entry main.py --hardware
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+
+def run_once(entry, hardware):
+    """One cold start in a fresh interpreter; returns the parsed profile"""
+    command = [sys.executable, os.path.join(ROOT, entry), "--profile-startup", "--json"]
+    if not hardware:
+        command.append("--import-only")
+    env = dict(os.environ, GROQ_API_KEY=os.getenv("GROQ_API_KEY", "benchmark"))
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    # The profile is the last line; anything before it is the entry point's own output
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entry", default="recorder.py", choices=("recorder.py", "main.py"))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--hardware", action="store_true",
+                        help="Include PortAudio, sound load and first captured frame")
+    args = parser.parse_args()
+
+    profiles = [run_once(args.entry, args.hardware) for _ in range(args.runs)]
+    totals = [p["total_ms"] for p in profiles]
+
+    phases = {}
+    for profile in profiles:
+        for entry in profile["phases"]:
+            phases.setdefault(entry["phase"], []).append(entry["ms"])
+    imports = {}
+    for profile in profiles:
+        for entry in profile["imports"]:
+            if entry["depth"] == 0:
+                imports.setdefault(entry["module"], []).append(entry["ms"])
+
+    print(f"{args.entry}: {args.runs} cold starts, median per step")
+    print("-" * 60)
+    for name, values in sorted(imports.items(), key=lambda kv: -statistics.median(kv[1]))[:10]:
+        print(f"{'import ' + name:<45}{statistics.median(values):>10.1f} ms")
+    for name, values in phases.items():
+        print(f"{name:<45}{statistics.median(values):>10.1f} ms")
+    print("-" * 60)
+    median_total = statistics.median(totals)
+    print(f"{'Total':<45}{median_total:>10.1f} ms  (budget {args.budget_ms:.0f} ms)")
+
+    if median_total > args.budget_ms:
+        print("FAIL: cold start is over budget")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Groq transcription API
+
+Serves just enough of the OpenAI-compatible endpoints for groq_whisperer to
+run offline: GET /openai/v1/models and POST /openai/v1/audio/transcriptions.
+Latency and upload bandwidth are simulated so benchmarks are repeatable.
+
+    python benchmarks/fake_groq_server.py --port 8765 --latency 0.3
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=fake python recorder.py
+"""
+import argparse
+import json
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_TEXT = "The quick brown fox jumps over the lazy dog."
+
+# With a simulated uplink the body is read in pieces this big, each once its time has come
+UPLINK_READ_BYTES = 16 * 1024
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so pooled clients can reuse connections
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes
+
+    def setup(self):
+        super().setup()
+        # Stand-in for DNS + TCP + TLS cost on a real network, paid once per connection
+        if self.server.handshake:
+            time.sleep(self.server.handshake)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send(200, json.dumps({"object": "list", "data": [
+                {"id": "whisper-large-v3-turbo", "object": "model", "owned_by": "fake"},
+            ]}))
+        else:
+            self._send(404, json.dumps({"error": {"message": "not found"}}))
+
+    def _read_body(self, length):
+        """Read a request body no faster than the simulated uplink, so clients can time the upload"""
+        bandwidth = self.server.bandwidth
+        if not bandwidth:
+            return self.rfile.read(length)
+        parts = []
+        start = time.perf_counter()
+        received = 0
+        while received < length:
+            part = self.rfile.read(min(UPLINK_READ_BYTES, length - received))
+            if not part:
+                break
+            parts.append(part)
+            received += len(part)
+            delay = start + received / bandwidth - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return b"".join(parts)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self._read_body(length)
+        if not self.path.rstrip("/").endswith("/audio/transcriptions"):
+            self._send(404, json.dumps({"error": {"message": "not found"}}))
+            return
+
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.bytes_received += length
+            fault = server.next_fault() or server.check_rate_limit()
+        if fault is not None:
+            status, headers = fault
+            self._send(status, json.dumps({"error": {"message": f"injected {status}"}}), headers=headers)
+            return
+
+        # Simulated model inference time (the uplink was simulated while reading)
+        time.sleep(server.latency)
+
+        text = server.text
+        if b'name="response_format"\r\n\r\njson' in body:
+            self._send(200, json.dumps({"text": text}))
+        else:
+            self._send(200, text, content_type="text/plain")
+
+
+class FakeGroqServer(ThreadingHTTPServer):
+    """Threaded fake API server
+
+    ``faults`` is a list of (status, headers) to return first. With
+    ``rate_limit``, transcriptions beyond that many per ``rate_window``
+    seconds (a minute by default) get a 429 with Retry-After, like the real API.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.2, bandwidth=None, handshake=0.0,
+                 text=DEFAULT_TEXT, faults=None, rate_limit=None, rate_window=60.0, verbose=False):
+        super().__init__(address, FakeGroqHandler)
+        self.latency = latency
+        self.handshake = handshake
+        self.bandwidth = bandwidth
+        self.text = text
+        self.faults = list(faults or [])
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.accepted = []  # Times of transcriptions inside the current window
+        self.rejected = 0
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_received = 0
+
+    def next_fault(self):
+        return self.faults.pop(0) if self.faults else None
+
+    def check_rate_limit(self):
+        """A 429 fault if this request is over the rate limit (call with the lock held)"""
+        if not self.rate_limit:
+            return None
+        now = time.monotonic()
+        self.accepted = [t for t in self.accepted if now - t < self.rate_window]
+        if len(self.accepted) >= self.rate_limit:
+            self.rejected += 1
+            wait = self.rate_window - (now - self.accepted[0])
+            return 429, {"Retry-After": f"{wait:.2f}"}
+        self.accepted.append(now)
+        return None
+
+    @property
+    def base_url(self):
+        scheme = "https" if isinstance(self.socket, ssl.SSLSocket) else "http"
+        host, port = self.server_address[:2]
+        return f"{scheme}://{host}:{port}"
+
+    def start(self):
+        """Serve on a daemon thread; returns self"""
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+
+def serve(port=0, latency=0.2, bandwidth=None, certfile=None, keyfile=None, **options):
+    """Start a fake server in the background, optionally over TLS"""
+    server = FakeGroqServer(("127.0.0.1", port), latency=latency, bandwidth=bandwidth, **options)
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    return server.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds of simulated inference")
+    parser.add_argument("--bandwidth-kbps", type=float, default=0, help="Simulated uplink, 0 for unlimited")
+    parser.add_argument("--handshake", type=float, default=0.0, help="Seconds of simulated setup per connection")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Transcriptions per minute, 0 for unlimited")
+    parser.add_argument("--text", default=DEFAULT_TEXT)
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = serve(
+        args.port, args.latency, args.bandwidth_kbps * 1024 or None,
+        certfile=args.certfile, keyfile=args.keyfile, handshake=args.handshake,
+        text=args.text, rate_limit=args.rate_limit or None, verbose=args.verbose,
+    )
+    print(f"Fake Groq API listening on {server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Stand-in for the pyaudio module, feeding prepared PCM instead of a microphone
+
+Install it before anything imports pyaudio, then queue audio on the shared
+device; callback streams deliver it in real-time-sized chunks (optionally
+faster than real time) and then silence, like an idle microphone.
+
+    from benchmarks import fake_pyaudio
+    sys.modules["pyaudio"] = fake_pyaudio
+    fake_pyaudio.device.play(pcm)  # 16-bit PCM at device.rate / device.channels
+"""
+import threading
+import time
+
+paInt16 = 8
+paContinue = 0
+
+
+class FakeDevice:
+    """One input device at a fixed format, 48 kHz stereo like most built-in microphones
+
+    Queued audio is delivered at ``speed`` times real time (0: as fast as the
+    callback keeps up); the silence after it always comes at real time.
+    """
+
+    def __init__(self, rate=48000, channels=2, speed=1.0, name="Fake Microphone"):
+        self.rate = rate
+        self.channels = channels
+        self.speed = speed
+        self.name = name
+        self.lock = threading.Lock()
+        self.source = b""
+        self.position = 0
+        self.drained = threading.Event()
+        self.drained.set()
+
+    def play(self, pcm):
+        """Queue audio to be captured next; ``drained`` is set once it has all been delivered"""
+        with self.lock:
+            self.source = bytes(pcm)
+            self.position = 0
+            self.drained.clear()
+
+    def read(self, num_bytes):
+        with self.lock:
+            data = self.source[self.position:self.position + num_bytes]
+            self.position += len(data)
+            if self.position >= len(self.source):
+                self.drained.set()
+        return data + bytes(num_bytes - len(data))
+
+    def info(self):
+        return {"name": self.name, "maxInputChannels": self.channels, "defaultSampleRate": float(self.rate)}
+
+
+device = FakeDevice()
+
+
+class Stream:
+    """Callback-mode input stream driven by a thread, like PortAudio's"""
+
+    def __init__(self, rate, channels, frames_per_buffer, stream_callback, start=True, **_):
+        self.rate = rate
+        self.channels = channels
+        self.frames = frames_per_buffer
+        self.callback = stream_callback
+        self.active = threading.Event()
+        self.thread = None
+        if start:
+            self.start_stream()
+
+    def _run(self):
+        chunk_bytes = self.frames * self.channels * 2
+        chunk_seconds = self.frames / self.rate
+        next_at = time.perf_counter()
+        while self.active.is_set():
+            speed = 1.0 if device.drained.is_set() else device.speed
+            self.callback(device.read(chunk_bytes), self.frames, {}, 0)
+            if not speed:
+                next_at = time.perf_counter()
+            else:
+                next_at += chunk_seconds / speed
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def start_stream(self):
+        if self.active.is_set():
+            return
+        self.active.set()
+        self.thread = threading.Thread(target=self._run, name="fake-portaudio")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop_stream(self):
+        self.active.clear()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def is_active(self):
+        return self.active.is_set()
+
+    def is_stopped(self):
+        return not self.active.is_set()
+
+    def close(self):
+        self.stop_stream()
+
+
+class PyAudio:
+    def get_device_count(self):
+        return 1
+
+    def get_device_info_by_index(self, index):
+        if index != 0:
+            raise IOError(f"Invalid device index {index}")
+        return device.info()
+
+    def is_format_supported(self, rate, input_device=None, input_channels=None, input_format=None):
+        if (rate, input_channels) != (device.rate, device.channels):
+            raise ValueError("Invalid sample rate")
+        return True
+
+    def open(self, format=paInt16, channels=1, rate=16000, input=True, frames_per_buffer=1024,
+             input_device_index=None, stream_callback=None, start=True):
+        return Stream(rate, channels, frames_per_buffer, stream_callback, start=start)
+
+    def terminate(self):
+        pass
@@ -0,0 +1,55 @@
+import os
+
+# Settings are read at import time, so .env has to be loaded before any module does
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    pass
+else:
+    load_dotenv()
+
+
+def _clean(value):
+    """Strip inline comments and whitespace from an .env value"""
+    if value is None:
+        return None
+    value = value.split('#')[0].strip()
+    return value or None
+
+
+def env_str(name, default=None):
+    """Read a string setting from the environment"""
+    value = _clean(os.getenv(name))
+    return default if value is None else value
+
+
+def env_int(name, default=None):
+    """Read an integer setting from the environment"""
+    value = _clean(os.getenv(name))
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"Warning: Invalid {name} value '{value}', using {default}")
+        return default
+
+
+def env_float(name, default=None):
+    """Read a float setting from the environment"""
+    value = _clean(os.getenv(name))
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Warning: Invalid {name} value '{value}', using {default}")
+        return default
+
+
+def env_bool(name, default=False):
+    """Read a yes/no setting from the environment"""
+    value = _clean(os.getenv(name))
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+import time
+
+import startup_profile
+from config import env_int, env_str
+from generate_sounds import CUE_CHANNELS, CUE_SAMPLE_RATE, load_cue
+
+# Cues are synthesised by generate_sounds.py; point these at sound files to play those instead
+START_SOUND = env_str("CUE_START_SOUND")
+COMPLETE_SOUND = env_str("CUE_COMPLETE_SOUND")
+
+# Small mixer buffer so a cue starts within a few milliseconds of play()
+MIXER_BUFFER = env_int("CUE_MIXER_BUFFER", 512)
+
+# The stop cue is the start cue restarted after this long
+DOUBLE_GAP_SECONDS = 0.3
+
+# Extra audio dropped after the start cue for speaker-to-microphone delay and ring-out
+CUE_TAIL_SECONDS = 0.05
+
+
+class CuePlayer:
+    """Cue sounds held in memory as PCM and played on a reserved mixer channel
+
+    Synthesised cues are cached in the mixer's own format, so loading one is
+    a file read with no decoding, and playing it only hands a buffer to the
+    mixer and returns immediately.
+    """
+
+    def __init__(self, start_sound=START_SOUND, complete_sound=COMPLETE_SOUND):
+        with startup_profile.phase("import pygame"):
+            import pygame
+        self.pygame = pygame
+        if not pygame.mixer.get_init():
+            with startup_profile.phase("mixer init"):
+                pygame.mixer.pre_init(frequency=CUE_SAMPLE_RATE, size=-16, channels=CUE_CHANNELS,
+                                      buffer=MIXER_BUFFER)
+                pygame.mixer.init()
+        # Keep one channel for cues so they never wait on, or cut off, anything else
+        pygame.mixer.set_reserved(1)
+        self.channel = pygame.mixer.Channel(0)
+
+        with startup_profile.phase("sound load"):
+            start = self._load("start", start_sound)
+            self.sounds = {
+                "start": start,
+                "complete": self._load("complete", complete_sound),
+                "stop": self._double(start),
+            }
+
+    def _load(self, name, path=None):
+        """A cue from its sound file if one is set, else synthesised for the mixer's actual format"""
+        if path:
+            return self.pygame.mixer.Sound(path)
+        frequency, _, channels = self.pygame.mixer.get_init()
+        return self.pygame.mixer.Sound(buffer=load_cue(name, frequency, channels))
+
+    def _double(self, sound):
+        """The start cue interrupted by itself after DOUBLE_GAP_SECONDS, as one buffer"""
+        frequency, size, channels = self.pygame.mixer.get_init()
+        frame_bytes = abs(size) // 8 * channels
+        gap = int(DOUBLE_GAP_SECONDS * frequency) * frame_bytes
+        raw = sound.get_raw()
+        return self.pygame.mixer.Sound(buffer=raw[:gap] + raw)
+
+    def length(self, name):
+        """Duration of a cue in seconds"""
+        return self.sounds[name].get_length()
+
+    def play(self, name):
+        """Start a cue and return immediately"""
+        try:
+            self.channel.play(self.sounds[name])
+        except Exception as e:
+            print(f"Warning: Could not play {name} sound: {e}")
+
+    def wait(self, timeout=2.0):
+        """Let a cue that is still playing finish, e.g. before the process exits"""
+        deadline = time.time() + timeout
+        while self.channel.get_busy() and time.time() < deadline:
+            time.sleep(0.01)
+
+    def capture_skip(self):
+        """Seconds of capture to drop when recording starts with the start cue"""
+        return self.length("start") + CUE_TAIL_SECONDS
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+import io
+import json
+import os
+import threading
+import time
+import wave
+
+import numpy as np
+
+import metrics
+from config import env_float, env_str
+
+
+# "auto" picks per recording; otherwise one of CODECS
+UPLOAD_CODEC = env_str("UPLOAD_CODEC", "auto").lower()
+
+# Keep a copy of every upload here for debugging or re-processing (off by default)
+ARCHIVE_AUDIO_DIR = env_str("ARCHIVE_AUDIO_DIR")
+
+# Assumed uplink before any upload has been measured (kilobytes per second)
+DEFAULT_UPLINK_KBPS = env_float("UPLINK_KBPS", 250.0)
+
+# Groq rejects larger uploads on the free tier
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+# Measured uplink throughput and encode costs, remembered between one-shot runs
+ESTIMATES_FILE = ".upload.estimates"
+
+# A body "sent" quicker than this went into socket buffers, and says nothing about the link
+MIN_MEASURED_SECONDS = 0.1
+
+# Rough size ratio against 16-bit PCM, and encode cost per second of audio until
+# encodes have been timed here; calibrated with benchmarks/bench_codecs.py on 16 kHz mono speech
+CODEC_PROFILES = {
+    "wav": {"suffix": ".wav", "ratio": 1.0, "encode_seconds": 0.00001},
+    "flac": {"suffix": ".flac", "ratio": 0.65, "encode_seconds": 0.0004},
+    "opus": {"suffix": ".ogg", "ratio": 0.1, "encode_seconds": 0.04},
+}
+CODECS = tuple(CODEC_PROFILES)
+
+# Opus only runs at these rates
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+_soundfile = False  # Not looked up yet
+
+
+def _get_soundfile():
+    """Import the optional soundfile package on first use (FLAC and Ogg/Opus via libsndfile)"""
+    global _soundfile
+    if _soundfile is False:
+        try:
+            import soundfile
+        except ImportError:
+            soundfile = None
+        _soundfile = soundfile
+    return _soundfile
+
+
+def available_codecs(sample_rate=None):
+    """Codecs that can be encoded in this environment"""
+    soundfile = _get_soundfile()
+    if soundfile is None:
+        return ("wav",)
+    if "OPUS" in soundfile.available_subtypes("OGG") and sample_rate in (None,) + OPUS_SAMPLE_RATES:
+        return CODECS
+    return ("wav", "flac")
+
+
+def codec_suffix(codec):
+    """File extension the API uses to recognise the container"""
+    return CODEC_PROFILES[codec]["suffix"]
+
+
+def encode_wav(pcm, sample_rate, channels):
+    """Wrap 16-bit PCM in a WAV container"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def _encode_soundfile(pcm, sample_rate, channels, format, subtype):
+    """Encode 16-bit PCM through libsndfile into an in-memory container"""
+    soundfile = _get_soundfile()
+    if soundfile is None:
+        raise RuntimeError("soundfile is not installed; only WAV uploads are available")
+    samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels)
+    buffer = io.BytesIO()
+    soundfile.write(buffer, samples, sample_rate, format=format, subtype=subtype)
+    return buffer.getvalue()
+
+
+def encode_flac(pcm, sample_rate, channels):
+    """Lossless FLAC encoding"""
+    return _encode_soundfile(pcm, sample_rate, channels, "FLAC", "PCM_16")
+
+
+def encode_opus(pcm, sample_rate, channels):
+    """Lossy Opus in an Ogg container"""
+    return _encode_soundfile(pcm, sample_rate, channels, "OGG", "OPUS")
+
+
+ENCODERS = {
+    "wav": encode_wav,
+    "flac": encode_flac,
+    "opus": encode_opus,
+}
+
+
+_estimates = None
+_estimates_lock = threading.Lock()
+
+
+def _load_estimates():
+    """The saved estimates, read once per process; call with _estimates_lock held"""
+    global _estimates
+    if _estimates is None:
+        try:
+            with open(ESTIMATES_FILE) as f:
+                _estimates = json.load(f)
+        except (OSError, ValueError):
+            _estimates = {}
+        _estimates.setdefault("encode_seconds", {})
+    return _estimates
+
+
+def _save_estimates():
+    """Write the estimates atomically; call with _estimates_lock held"""
+    tmp = f"{ESTIMATES_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(_estimates, f)
+        os.replace(tmp, ESTIMATES_FILE)
+    except OSError as e:
+        print(f"Warning: Could not save upload estimates: {e}")
+
+
+def load_uplink_estimate():
+    """Last measured uplink throughput in bytes per second"""
+    with _estimates_lock:
+        return _load_estimates().get("uplink", DEFAULT_UPLINK_KBPS * 1024)
+
+
+def encode_cost(codec):
+    """Seconds to encode one second of audio with a codec, as measured here if it has been"""
+    with _estimates_lock:
+        return _load_estimates()["encode_seconds"].get(codec, CODEC_PROFILES[codec]["encode_seconds"])
+
+
+def record_upload(num_bytes, elapsed):
+    """Fold the time one request body took to send into the uplink estimate
+
+    ``elapsed`` must cover only sending the body, not the server's reply;
+    groq_client times it from the HTTP connection.
+    """
+    if num_bytes <= 0 or elapsed < MIN_MEASURED_SECONDS:
+        return
+    with _estimates_lock:
+        estimates = _load_estimates()
+        # Exponentially weighted so one slow request doesn't swing the choice
+        previous = estimates.get("uplink", DEFAULT_UPLINK_KBPS * 1024)
+        estimates["uplink"] = round(0.7 * previous + 0.3 * (num_bytes / elapsed))
+        _save_estimates()
+
+
+def record_encode(codec, elapsed, duration):
+    """Fold one timed encode into that codec's cost per second of audio"""
+    if duration <= 0:
+        return
+    with _estimates_lock:
+        costs = _load_estimates()["encode_seconds"]
+        previous = costs.get(codec, CODEC_PROFILES[codec]["encode_seconds"])
+        costs[codec] = 0.7 * previous + 0.3 * (elapsed / duration)
+        _save_estimates()
+
+
+def choose_codec(pcm_bytes, duration, uplink=None, codecs=None):
+    """Pick the codec with the lowest estimated encode plus upload time"""
+    if uplink is None:
+        uplink = load_uplink_estimate()
+    if codecs is None:
+        codecs = available_codecs()
+
+    # Codecs whose output would be rejected for size are only a last resort
+    fitting = [c for c in codecs if pcm_bytes * CODEC_PROFILES[c]["ratio"] <= MAX_UPLOAD_BYTES]
+    if not fitting:
+        return min(codecs, key=lambda c: CODEC_PROFILES[c]["ratio"])
+
+    def _cost(codec):
+        return duration * encode_cost(codec) + pcm_bytes * CODEC_PROFILES[codec]["ratio"] / uplink
+
+    return min(fitting, key=_cost)
+
+
+def encode_audio(pcm, sample_rate, channels, codec=None):
+    """Encode PCM for upload; returns (data, codec)
+
+    With no codec given, UPLOAD_CODEC decides, and "auto" picks per recording.
+    """
+    codec = codec or UPLOAD_CODEC
+    codecs = available_codecs(sample_rate)
+    duration = len(pcm) / (sample_rate * channels * 2)
+    if codec == "auto":
+        codec = choose_codec(len(pcm), duration, codecs=codecs)
+    elif codec not in codecs:
+        print(f"Warning: Codec '{codec}' not available, falling back to WAV")
+        codec = "wav"
+
+    start = time.perf_counter()
+    data = ENCODERS[codec](pcm, sample_rate, channels)
+    elapsed = time.perf_counter() - start
+    record_encode(codec, elapsed, duration)
+    print(f"Encoded {len(pcm)} bytes of PCM as {codec}: {len(data)} bytes in {elapsed * 1000:.0f} ms")
+    return data, codec
+
+
+def archive_upload(name, data, archive_dir=ARCHIVE_AUDIO_DIR):
+    """Write an encoded upload to the archive directory, if one is configured"""
+    if not archive_dir:
+        return None
+    archive_dir = os.path.expanduser(archive_dir)
+    try:
+        os.makedirs(archive_dir, exist_ok=True)
+        path = os.path.join(archive_dir, time.strftime("%Y%m%d-%H%M%S-") + name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+    except OSError as e:
+        print(f"Warning: Could not archive audio: {e}")
+        return None
+
+
+def build_upload(pcm, sample_rate, channels, codec=None):
+    """Encode PCM straight into an in-memory (filename, bytes) upload
+
+    Nothing touches the disk unless ARCHIVE_AUDIO_DIR is set.
+    """
+    data, codec = encode_audio(pcm, sample_rate, channels, codec)
+    name = "recording" + codec_suffix(codec)
+    path = archive_upload(name, data)
+    if path:
+        print(f"Archived audio to {path}")
+        trace = metrics.current()
+        if trace is not None and trace.audio_path is None:
+            trace.audio_path = path
+    return name, data
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Transcription engines: the Groq API, a resident local model, and the policy choosing between them
+
+Every engine takes preprocessed 16-bit PCM and returns text, raising on
+failure. ``EngineRouter`` sends short clips to the local model (no network
+round-trip for one-word commands), everything else to Groq, and falls back
+to the local model when Groq can't be reached.
+"""
+import importlib.util
+import os
+import threading
+import time
+
+import numpy as np
+
+import metrics
+import startup_profile
+from audio_processing import downmix, pcm_to_array, resample_poly
+from config import env_float, env_int, env_str
+from encoders import build_upload
+from hedging import GROQ_HEDGE, Hedger
+from longform import needs_chunking, transcribe_long
+from rate_limiter import RequestScheduler, is_network_error
+from transcription_cache import audio_key, open_cache
+
+# groq, local or auto (short clips locally, the rest on Groq, local fallback when offline)
+TRANSCRIPTION_ENGINE = env_str("TRANSCRIPTION_ENGINE", "groq").lower()
+
+GROQ_MODEL = env_str("GROQ_MODEL", "whisper-large-v3-turbo")
+
+# faster-whisper model name or path; int8 keeps a small model fast on CPU
+LOCAL_MODEL = env_str("LOCAL_MODEL", "base.en")
+LOCAL_COMPUTE_TYPE = env_str("LOCAL_COMPUTE_TYPE", "int8")
+LOCAL_THREADS = env_int("LOCAL_THREADS", 0)  # 0 lets CTranslate2 decide
+# In auto mode, clips up to this long never leave the machine
+LOCAL_MAX_SECONDS = env_float("LOCAL_MAX_SECONDS", 4.0)
+
+# Whisper prompt; the model only reads its last 224 tokens, so context goes at the end
+PROMPT = """Australian software developer using British/Australian spelling (colour, optimise, centre).
+            Context: Python programming, technical discussions.
+            Expected content:
+            - Programming terms (Python, Git, Docker)
+            - Code syntax and commands
+            - File paths (/home/user/, .py, .env)
+            - Technical jargon and package names
+            Please transcribe symbols exactly ('underscore' for _, 'dot' for .) and maintain proper capitalisation of technical terms."""
+
+# Local models are fed 16 kHz mono float audio
+LOCAL_SAMPLE_RATE = 16000
+
+
+def build_prompt(context=None):
+    """The fixed prompt, followed by text spoken just before this audio if known"""
+    return PROMPT + (f"\nPreviously: {context}" if context else "")
+
+
+class GroqEngine:
+    """Whisper on the Groq API; ``get_client`` returns the shared, lazily created client
+
+    Requests made through ``transcribe`` go through the scheduler, which keeps
+    them within the rate limits and retries transient failures, and with
+    GROQ_HEDGE through a hedger that duplicates unusually slow ones.
+    """
+
+    name = "groq"
+
+    def __init__(self, get_client, model=GROQ_MODEL, scheduler=None, hedge=GROQ_HEDGE):
+        self.get_client = get_client
+        self.model = model
+        self.scheduler = scheduler or RequestScheduler()
+        self.hedger = Hedger(self.scheduler) if hedge else None
+        self.signature = f"groq\0{model}\0en\0{PROMPT}"
+
+    def transcribe_upload(self, audio_file, context=None, preview=False):
+        """Transcribe an in-memory (filename, bytes) upload or an audio file path
+
+        Previews are timed under their own label, apart from real requests.
+        """
+        if isinstance(audio_file, str):
+            with open(audio_file, "rb") as file:
+                audio_file = (os.path.basename(audio_file), file.read())
+        metrics.mark("request_sent")
+        start = time.time()
+        transcription = self.get_client().audio.transcriptions.create(
+            file=audio_file,
+            model=self.model,
+            prompt=build_prompt(context),
+            response_format="text",
+            language="en",
+        )
+        elapsed = time.time() - start
+        metrics.mark("response_received")
+        metrics.record_request(f"{self.name}_preview" if preview else self.name, elapsed, len(audio_file[1]))
+        return transcription.strip() if transcription else None
+
+    def transcribe(self, data, sample_rate, channels, context=None, sample_width=2):
+        upload = build_upload(data, sample_rate, channels)
+        metrics.mark("encoded")
+        seconds = len(data) / (sample_rate * channels * sample_width)
+        request = lambda: self.transcribe_upload(upload, context)
+        if self.hedger is not None:
+            return self.scheduler.run(lambda: self.hedger.run(request, seconds), seconds)
+        return self.scheduler.run(request, seconds)
+
+    def warm(self):
+        pass
+
+
+class LocalEngine:
+    """faster-whisper on the CPU, loaded once and kept resident
+
+    CTranslate2 already spreads one transcription over all cores, so calls
+    are serialised rather than competing for them.
+    """
+
+    name = "local"
+
+    def __init__(self, model=LOCAL_MODEL, compute_type=LOCAL_COMPUTE_TYPE, threads=LOCAL_THREADS):
+        self.model_name = model
+        self.compute_type = compute_type
+        self.threads = threads
+        self.signature = f"local\0{model}\0{compute_type}\0en\0{PROMPT}"
+        self.model = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        """faster-whisper is an optional dependency"""
+        return importlib.util.find_spec("faster_whisper") is not None
+
+    def load(self):
+        """Load the model on first use; later calls return the resident one"""
+        with self.lock:
+            if self.model is None:
+                with startup_profile.phase("local model load"):
+                    from faster_whisper import WhisperModel
+                    self.model = WhisperModel(
+                        self.model_name, device="cpu",
+                        compute_type=self.compute_type, cpu_threads=self.threads,
+                    )
+        return self.model
+
+    def warm(self):
+        """Load the model in the background so the first short clip doesn't wait for it"""
+        thread = threading.Thread(target=self.load, name="local-model")
+        thread.daemon = True
+        thread.start()
+
+    def transcribe(self, data, sample_rate, channels, context=None, preview=False):
+        samples = downmix(pcm_to_array(data, channels))[:, 0]
+        if sample_rate != LOCAL_SAMPLE_RATE:
+            samples = resample_poly(samples, LOCAL_SAMPLE_RATE, sample_rate)
+        audio = np.asarray(samples, dtype=np.float32) / 32768.0
+        model = self.load()
+        with self.lock:
+            metrics.mark("request_sent")
+            start = time.time()
+            segments, _ = model.transcribe(
+                audio,
+                language="en",
+                initial_prompt=build_prompt(context),
+                beam_size=1,
+                condition_on_previous_text=False,
+            )
+            text = " ".join(segment.text.strip() for segment in segments)
+        metrics.mark("response_received")
+        metrics.record_request(f"{self.name}_preview" if preview else self.name, time.time() - start)
+        return text.strip() or None
+
+
+class EngineRouter:
+    """Pick an engine per recording according to TRANSCRIPTION_ENGINE
+
+    With a ``cache``, clips already transcribed by the chosen engine are
+    answered from it without touching the engine at all.
+    """
+
+    def __init__(self, remote, local=None, policy=TRANSCRIPTION_ENGINE, local_max_seconds=LOCAL_MAX_SECONDS,
+                 cache=None):
+        if policy not in ("groq", "local", "auto"):
+            print(f"Warning: Unknown TRANSCRIPTION_ENGINE '{policy}', using groq")
+            policy = "groq"
+        if policy != "groq" and local is None:
+            print("Warning: faster-whisper is not installed; transcribing with Groq only")
+            policy = "groq"
+        self.remote = remote
+        self.local = local
+        self.policy = policy
+        self.local_max_seconds = local_max_seconds
+        self.cache = cache
+        if policy == "auto":
+            # Fall back to the local model at once instead of retrying an outage
+            remote.scheduler.retry_network = False
+
+    def choose(self, seconds):
+        if self.policy == "local":
+            return self.local
+        if self.policy == "auto" and seconds <= self.local_max_seconds:
+            return self.local
+        return self.remote
+
+    def warm(self):
+        """Get the engines this policy can use ready in the background"""
+        if self.policy != "groq":
+            self.local.warm()
+
+    def transcribe_partial(self, data, sample_rate, channels, context=None):
+        """Best-effort preview of audio that is still being recorded; None when skipped
+
+        Uses the local model when there is one. Groq previews are only sent
+        while the rate-limit budget has room to spare and within their own
+        share of it, are never cached and never retried, so they can't hold
+        up final transcriptions.
+        """
+        try:
+            if self.local is not None and self.policy != "groq":
+                return self.local.transcribe(data, sample_rate, channels, context, preview=True)
+            seconds = len(data) / (sample_rate * channels * 2)
+            return self.remote.scheduler.try_run(
+                lambda: self.remote.transcribe_upload(build_upload(data, sample_rate, channels), context, preview=True),
+                seconds,
+            )
+        except Exception as e:
+            print(f"\nPreview transcription error: {e}")
+            return None
+
+    def _transcribe_one(self, engine, data, sample_rate, channels, context=None):
+        # Prompt context is left out of the key: it only nudges spelling at the
+        # boundary, and chunked replays would otherwise never hit
+        key = None
+        if self.cache is not None:
+            key = audio_key(data, sample_rate, channels, engine.signature)
+            text = self.cache.get(key)
+            if text is not None:
+                print("Transcription cache hit")
+                return text
+        try:
+            text = engine.transcribe(data, sample_rate, channels, context)
+        except Exception as e:
+            if engine is self.remote and self.local is not None and self.policy == "auto" and is_network_error(e):
+                print(f"Groq unreachable ({e}); transcribing locally")
+                # Not cached: the key names the engine that failed
+                return self.local.transcribe(data, sample_rate, channels, context)
+            raise
+        if key is not None and text:
+            self.cache.put(key, text)
+        return text
+
+    def transcribe(self, data, sample_rate, channels, sample_width=2, raise_errors=False):
+        """Transcribe preprocessed PCM; returns the text, or None on failure unless ``raise_errors``"""
+        seconds = len(data) / (sample_rate * channels * sample_width)
+        engine = self.choose(seconds)
+        print(f"Transcribing {seconds:.1f}s with {engine.name}...")
+        try:
+            if engine is self.remote and needs_chunking(data, sample_rate, channels, sample_width):
+                return transcribe_long(
+                    data, sample_rate, channels,
+                    lambda chunk, context: self._transcribe_one(engine, chunk, sample_rate, channels, context),
+                    raise_errors=raise_errors,
+                )
+            return self._transcribe_one(engine, data, sample_rate, channels)
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Transcription error: {e}")
+            return None
+
+
+def create_engine(get_client, policy=TRANSCRIPTION_ENGINE):
+    """Router over Groq and, when faster-whisper is installed, the local model"""
+    local = LocalEngine() if LocalEngine.available() else None
+    return EngineRouter(GroqEngine(get_client), local, policy, cache=open_cache())
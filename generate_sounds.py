@@ -1,84 +1,176 @@
 #!/usr/bin/env python3
-import numpy as np
+"""Cue sound synthesis: generate_sounds.py [--wav DIR] [--sample-rate HZ] [--force]
+
+Each cue in CUES is a few sine tones with attack/decay envelopes, rendered
+with NumPy straight into the mixer's playback format: signed 16-bit
+interleaved PCM at the mixer's rate and channel count. Rendered cues are
+cached in CUE_CACHE_DIR under a hash of their spec and format, so the cue
+player reads ready-to-play bytes at startup and a cue is only synthesised
+again when its parameters change. Running this script fills the cache.
+"""
+import argparse
+import hashlib
+import json
+import os
 import wave
-import struct
+
+import numpy as np
+
+from config import env_int, env_str
+
+# Format the cue player asks the mixer for; cues are rendered for whatever it actually gets
+CUE_SAMPLE_RATE = env_int("CUE_SAMPLE_RATE", 44100)
+CUE_CHANNELS = 2
+SAMPLE_WIDTH = 2
+
+CUE_CACHE_DIR = env_str("CUE_CACHE_DIR", "~/.cache/groq_whisperer/cues")
+# JSON file overriding parts of CUES, e.g. {"start": {"gain": 0.2}}
+CUE_SPEC_FILE = env_str("CUE_SPEC_FILE")
+
+# Part of every cache key; bump it when rendering changes so cached cues are rebuilt
+SYNTH_VERSION = 1
+
+# gain is the peak level; attack/decay (seconds) apply to every tone unless a tone sets its own
+CUES = {
+    # A quiet three-note chime, also doubled for the stop cue
+    "start": {
+        "gain": 0.09,
+        "attack": 0.01,
+        "decay": 0.25,
+        "tones": [
+            {"frequency": 1490, "start": 0.1, "duration": 0.3},
+            {"frequency": 1290, "start": 0.3, "duration": 0.3},
+            {"frequency": 1516, "start": 0.5, "duration": 0.29},
+        ],
+    },
+    # A short bright blip
+    "complete": {
+        "gain": 0.35,
+        "attack": 0.005,
+        "decay": 0.15,
+        "tones": [
+            {"frequency": 690, "duration": 0.2},
+            {"frequency": 2430, "duration": 0.2, "amplitude": 0.3},
+        ],
+    },
+}
+
 
 def generate_sine_wave(frequency, duration, sample_rate=44100, amplitude=0.5):
     """Generate a sine wave with given frequency and duration"""
-    t = np.linspace(0, duration, int(sample_rate * duration))
-    wave_data = amplitude * np.sin(2 * np.pi * frequency * t)
-    return wave_data
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    return amplitude * np.sin(2 * np.pi * frequency * t)
+
 
 def apply_envelope(wave_data, sample_rate, attack=0.1, decay=0.2):
-    """Apply an ADSR envelope to the wave data"""
+    """Apply a linear attack and decay envelope to the wave data"""
     samples = len(wave_data)
-    attack_samples = int(attack * sample_rate)
-    decay_samples = int(decay * sample_rate)
-    
-    # Create envelope
+    attack_samples = min(samples, int(attack * sample_rate))
+    decay_samples = min(samples - attack_samples, int(decay * sample_rate))
     envelope = np.ones(samples)
-    # Attack
     envelope[:attack_samples] = np.linspace(0, 1, attack_samples)
-    # Decay
-    envelope[-decay_samples:] = np.linspace(1, 0, decay_samples)
-    
+    envelope[samples - decay_samples:] = np.linspace(1, 0, decay_samples)
     return wave_data * envelope
 
-def save_wave_file(filename, wave_data, sample_rate=44100):
-    """Save wave data to a WAV file"""
-    # Normalize to 16-bit range
-    normalized = np.int16(wave_data * 32767)
-    
-    with wave.open(filename, 'w') as wav_file:
-        wav_file.setnchannels(1)  # Mono
-        wav_file.setsampwidth(2)  # 2 bytes per sample
+
+def cue_spec(name, spec_file=CUE_SPEC_FILE):
+    """A cue's spec from CUES, with any overrides from CUE_SPEC_FILE"""
+    spec = dict(CUES[name])
+    if spec_file:
+        try:
+            with open(os.path.expanduser(spec_file)) as f:
+                overrides = json.load(f).get(name, {})
+            if not isinstance(overrides, dict):
+                raise ValueError(f"'{name}' is not an object")
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Warning: Ignoring CUE_SPEC_FILE {spec_file}: {e}")
+            return spec
+        spec.update(overrides)
+    return spec
+
+
+def synthesize(spec, sample_rate):
+    """Mono float samples of a cue, peaking at its gain"""
+    rendered = []
+    for tone in spec["tones"]:
+        samples = generate_sine_wave(tone["frequency"], tone["duration"], sample_rate, tone.get("amplitude", 1.0))
+        samples = apply_envelope(samples, sample_rate, tone.get("attack", spec.get("attack", 0.01)),
+                                 tone.get("decay", spec.get("decay", 0.1)))
+        rendered.append((int(tone.get("start", 0.0) * sample_rate), samples))
+    mix = np.zeros(max(offset + len(samples) for offset, samples in rendered))
+    for offset, samples in rendered:
+        mix[offset:offset + len(samples)] += samples
+    peak = np.abs(mix).max()
+    return mix * (spec.get("gain", 0.5) / peak) if peak else mix
+
+
+def to_pcm(wave_data, channels=CUE_CHANNELS):
+    """Float samples in [-1, 1] as interleaved signed 16-bit PCM bytes"""
+    samples = np.int16(np.clip(wave_data, -1, 1) * 32767)
+    return np.repeat(samples[:, None], channels, axis=1).tobytes()
+
+
+def save_wave_file(filename, pcm, sample_rate=44100, channels=1):
+    """Save 16-bit PCM bytes to a WAV file"""
+    with wave.open(filename, "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(SAMPLE_WIDTH)
         wav_file.setframerate(sample_rate)
-        
-        # Convert to bytes and write
-        for sample in normalized:
-            wav_file.writeframes(struct.pack('h', sample))
-
-def generate_start_sound():
-    """Generate a pleasant start sound"""
-    duration = 3.0
-    sample_rate = 44100
-    
-    # Create a rising tone
-    base_freq = 440  # A4 note
-    wave1 = generate_sine_wave(base_freq, duration, sample_rate)
-    wave2 = generate_sine_wave(base_freq * 1.5, duration, sample_rate)  # Perfect fifth
-    
-    # Combine waves
-    combined = (wave1 + wave2) / 2
-    
-    # Apply envelope
-    final_wave = apply_envelope(combined, sample_rate, attack=0.1, decay=0.3)
-    
-    # Save to file
-    save_wave_file('sounds/start.wav', final_wave)
-
-def generate_complete_sound():
-    """Generate a pleasant completion sound"""
-    duration = 3.0
-    sample_rate = 44100
-    
-    # Create a descending tone
-    base_freq = 880  # A5 note
-    wave1 = generate_sine_wave(base_freq, duration, sample_rate)
-    wave2 = generate_sine_wave(base_freq * 1.25, duration, sample_rate)  # Major third
-    
-    # Combine waves
-    combined = (wave1 + wave2) / 2
-    
-    # Apply envelope
-    final_wave = apply_envelope(combined, sample_rate, attack=0.1, decay=0.4)
-    
-    # Save to file
-    save_wave_file('sounds/complete.wav', final_wave)
+        wav_file.writeframes(pcm)
+
+
+def cache_path(name, spec, sample_rate, channels, cache_dir=CUE_CACHE_DIR):
+    """Where a cue rendered from this spec, in this format, is cached"""
+    key = json.dumps([SYNTH_VERSION, spec, sample_rate, channels, SAMPLE_WIDTH], sort_keys=True)
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(os.path.expanduser(cache_dir), f"{name}-{sample_rate}x{channels}-{digest}.pcm")
+
+
+def load_cue(name, sample_rate=CUE_SAMPLE_RATE, channels=CUE_CHANNELS, force=False, spec=None):
+    """A cue as raw playback PCM, from the cache or synthesised (and cached) on a miss"""
+    spec = cue_spec(name) if spec is None else spec
+    path = cache_path(name, spec, sample_rate, channels)
+    if not force:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+    try:
+        pcm = to_pcm(synthesize(spec, sample_rate), channels)
+    except (KeyError, TypeError, ValueError) as e:
+        if spec == CUES[name]:
+            raise
+        print(f"Warning: Invalid {name} cue spec ({e!r}); using the built-in one")
+        return load_cue(name, sample_rate, channels, force, CUES[name])
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(pcm)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Warning: Could not cache {name} cue: {e}")
+    return pcm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sample-rate", type=int, default=CUE_SAMPLE_RATE)
+    parser.add_argument("--channels", type=int, default=CUE_CHANNELS)
+    parser.add_argument("--force", action="store_true", help="Render again even if cached")
+    parser.add_argument("--wav", metavar="DIR", help="Also write each cue as a WAV file, to listen to")
+    args = parser.parse_args()
+
+    for name in CUES:
+        pcm = load_cue(name, args.sample_rate, args.channels, force=args.force)
+        seconds = len(pcm) / (args.sample_rate * args.channels * SAMPLE_WIDTH)
+        print(f"{name}: {seconds:.2f}s")
+        if args.wav:
+            os.makedirs(args.wav, exist_ok=True)
+            save_wave_file(os.path.join(args.wav, f"{name}.wav"), pcm, args.sample_rate, args.channels)
+    print(f"Cached in {os.path.expanduser(CUE_CACHE_DIR)}")
+
 
 if __name__ == "__main__":
-    print("Generating start sound...")
-    generate_start_sound()
-    print("Generating complete sound...")
-    generate_complete_sound()
-    print("Done! New sound files have been created in the sounds directory.") 
\ No newline at end of file
+    main()
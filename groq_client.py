@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import os
+import threading
+import time
+
+from config import env_bool, env_float, env_int, env_str
+
+# Point at a stand-in server (see benchmarks/fake_groq_server.py) for offline runs
+GROQ_BASE_URL = env_str("GROQ_BASE_URL")
+
+# Unset: HTTP/2 when the optional h2 package is installed, else quietly HTTP/1.1
+GROQ_HTTP2 = env_bool("GROQ_HTTP2", None)
+GROQ_CONNECT_TIMEOUT = env_float("GROQ_CONNECT_TIMEOUT", 5.0)
+GROQ_TIMEOUT = env_float("GROQ_TIMEOUT", 60.0)
+# Retries for transcriptions are done by rate_limiter.RequestScheduler instead
+GROQ_MAX_RETRIES = env_int("GROQ_MAX_RETRIES", 0)
+GROQ_MAX_CONNECTIONS = env_int("GROQ_MAX_CONNECTIONS", 8)
+# Idle connections are kept open this long so the next dictation reuses them
+GROQ_KEEPALIVE_SECONDS = env_float("GROQ_KEEPALIVE_SECONDS", 120.0)
+
+# When the pooled connection last completed a request
+_last_response = 0.0
+
+
+def _touch(response):
+    """httpx response hook: remember that the pool has a live connection"""
+    global _last_response
+    _last_response = time.monotonic()
+
+
+def _time_upload(request):
+    """httpx request hook: time sending a transcription's body, apart from the server's reply
+
+    The whole request also waits on inference, so only the body send is
+    used for the uplink estimate that picks the upload codec.
+    """
+    if request.method != "POST" or not request.url.path.endswith("/audio/transcriptions"):
+        return
+    num_bytes = int(request.headers.get("content-length", 0))
+    started = []
+
+    def _trace(event, info):
+        # httpcore reports e.g. http11.send_request_body.started / http2.send_request_body.complete
+        if event.endswith("send_request_body.started"):
+            started.append(time.perf_counter())
+        elif event.endswith("send_request_body.complete") and started:
+            from encoders import record_upload
+            record_upload(num_bytes, time.perf_counter() - started[0])
+    request.extensions["trace"] = _trace
+
+
+def _http2_available():
+    """HTTP/2 needs the optional h2 package"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client(http2=GROQ_HTTP2, verify=True):
+    """Pooled keep-alive httpx client shared by every request in the process"""
+    import httpx
+
+    if http2 is None:
+        http2 = _http2_available()
+    elif http2 and not _http2_available():
+        print("Warning: GROQ_HTTP2 is on but h2 is not installed, falling back to HTTP/1.1")
+        http2 = False
+    return httpx.Client(
+        http2=http2,
+        verify=verify,
+        event_hooks={"request": [_time_upload], "response": [_touch]},
+        timeout=httpx.Timeout(GROQ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=GROQ_MAX_CONNECTIONS,
+            keepalive_expiry=GROQ_KEEPALIVE_SECONDS,
+        ),
+    )
+
+
+def create_client(api_key=None, base_url=GROQ_BASE_URL, http_client=None):
+    """Groq client on top of a pooled, long-lived connection"""
+    # groq pulls in pydantic and httpx; only pay for that once a client is needed
+    import httpx
+    from groq import Groq
+
+    return Groq(
+        api_key=api_key or os.getenv("GROQ_API_KEY"),
+        base_url=base_url,
+        http_client=http_client or create_http_client(),
+        timeout=httpx.Timeout(GROQ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+        max_retries=GROQ_MAX_RETRIES,
+    )
+
+
+def prewarm(client, wait=False, force=False):
+    """Open the API connection (DNS, TCP, TLS) ahead of the first upload
+
+    Runs a cheap request on a background thread so it overlaps with the
+    user speaking; the connection then sits in the pool for the upload.
+    Skipped while a recently used connection should still be alive.
+    """
+    idle = time.monotonic() - _last_response
+    if not force and idle < 0.8 * GROQ_KEEPALIVE_SECONDS:
+        return None
+
+    def _warm():
+        start = time.perf_counter()
+        try:
+            client.models.list()
+            print(f"\nAPI connection warmed in {(time.perf_counter() - start) * 1000:.0f} ms")
+        except Exception as e:
+            print(f"\nWarning: Could not pre-warm API connection: {e}")
+
+    thread = threading.Thread(target=_warm)
+    thread.daemon = True
+    thread.start()
+    if wait:
+        thread.join()
+    return thread
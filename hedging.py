@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Hedged requests: send a duplicate when the first is slower than usual
+
+Groq's latency has a long tail. With GROQ_HEDGE on, a request that hasn't
+answered within the GROQ_HEDGE_PERCENTILE latency of recent requests of a
+similar length gets a second, identical request, and whichever answers
+first is used. A blocking HTTP call can't be interrupted, so the slower one
+is abandoned (cancelled if it hasn't started) and its answer dropped.
+Duplicates are only sent while the rate-limit budget has room to spare.
+"""
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+from config import env_bool, env_float
+
+GROQ_HEDGE = env_bool("GROQ_HEDGE")
+# Hedge requests slower than this fraction of recent ones
+GROQ_HEDGE_PERCENTILE = env_float("GROQ_HEDGE_PERCENTILE", 0.9)
+# Threshold until enough requests of a length have been timed
+GROQ_HEDGE_AFTER_SECONDS = env_float("GROQ_HEDGE_AFTER_SECONDS", 2.0)
+# Never hedge sooner than this, however fast recent requests were
+GROQ_HEDGE_MIN_SECONDS = env_float("GROQ_HEDGE_MIN_SECONDS", 0.25)
+
+# Latencies kept per length class, and how many are needed before trusting them
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 10
+
+# Share of each rate-limit budget a duplicate must leave untouched
+HEDGE_BUDGET_RESERVE = 0.5
+
+
+def length_class(audio_seconds):
+    """Requests are compared with others of a similar length: <2s, <4s, <8s..."""
+    return int(math.log2(max(1.0, audio_seconds)))
+
+
+class Hedger:
+    """Run requests with a duplicate fired at the adaptive threshold"""
+
+    def __init__(self, scheduler, percentile=GROQ_HEDGE_PERCENTILE, after=GROQ_HEDGE_AFTER_SECONDS,
+                 min_seconds=GROQ_HEDGE_MIN_SECONDS):
+        self.scheduler = scheduler
+        self.percentile = percentile
+        self.after = after
+        self.min_seconds = min_seconds
+        self.executor = ThreadPoolExecutor(thread_name_prefix="hedge")
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def threshold(self, audio_seconds):
+        """Seconds to wait for the first request before sending a duplicate"""
+        with self.lock:
+            samples = sorted(self.latencies.get(length_class(audio_seconds), ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return self.after
+        index = min(len(samples) - 1, max(0, math.ceil(self.percentile * len(samples)) - 1))
+        return max(self.min_seconds, samples[index])
+
+    def _timed(self, request, audio_seconds):
+        """Submit a request; its latency is recorded when it succeeds, even if abandoned"""
+        start = time.perf_counter()
+        # Uploads count towards the caller's trace; its stages are marked in run()
+        future = self.executor.submit(metrics.wrap(request, marks=False))
+
+        def _record(done):
+            if done.exception() is None:
+                with self.lock:
+                    samples = self.latencies.setdefault(length_class(audio_seconds), deque(maxlen=HEDGE_WINDOW))
+                    samples.append(time.perf_counter() - start)
+        future.add_done_callback(_record)
+        return future
+
+    def run(self, request, audio_seconds=0):
+        """Call ``request()``, hedging it if slow; raises only when every copy failed
+
+        The request runs on pool threads, so pipeline marks are made here.
+        """
+        metrics.mark("request_sent")
+        primary = self._timed(request, audio_seconds)
+        threshold = self.threshold(audio_seconds)
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self.scheduler.has_spare(HEDGE_BUDGET_RESERVE):
+            result = primary.result()
+            metrics.mark("response_received")
+            return result
+
+        print(f"No answer after {threshold:.2f}s; sending a hedged duplicate")
+        with self.lock:
+            self.hedged += 1
+        # The duplicate is billed like any other request
+        self.scheduler.wait_turn(audio_seconds)
+        hedge = self._timed(request, audio_seconds)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for loser in pending:
+                    loser.cancel()
+                if future is hedge:
+                    with self.lock:
+                        self.hedge_wins += 1
+                metrics.mark("response_received")
+                return future.result()
+        raise error
+
+    def stats(self):
+        with self.lock:
+            return {"hedged": self.hedged, "hedge_wins": self.hedge_wins}
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Transcript history: history.py search|recent|export|import|stats
+
+Every delivered transcription is stored in one SQLite file (WAL mode, shared
+by the daemon and one-shot runs) with its timestamp, audio length, input
+device, stage latencies and archived audio path, and indexed with FTS5 for
+full-text search. Writes are queued and committed in batches on a
+background thread, after the text has already been output. ``export``
+writes the legacy ~/transcriptions.txt format; ``import`` loads such a file.
+"""
+import argparse
+import json
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from config import env_bool, env_float, env_str
+
+HISTORY = env_bool("HISTORY", True)
+HISTORY_PATH = env_str("HISTORY_PATH", "~/.local/share/groq_whisperer/history.sqlite3")
+# Also append to a plain text log in the old format, e.g. ~/transcriptions.txt (off unless set)
+HISTORY_TEXT_FILE = env_str("HISTORY_TEXT_FILE")
+# Writes arriving within this long of each other are committed together
+HISTORY_FLUSH_SECONDS = env_float("HISTORY_FLUSH_SECONDS", 0.5)
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+SEPARATOR = "-" * 80
+
+# One block of the legacy text log: blank line, [timestamp], text, separator
+LEGACY_BLOCK = re.compile(r"\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\]\n(.*?)\n-{80}\n", re.S)
+
+
+def format_legacy(created, text):
+    """One entry in the ~/transcriptions.txt format"""
+    return f"\n[{time.strftime(TIMESTAMP_FORMAT, time.localtime(created))}]\n{text}\n{SEPARATOR}\n"
+
+
+def append_text_file(text, path=HISTORY_TEXT_FILE, created=None):
+    """Append to the legacy text log, if one is configured"""
+    if not path:
+        return
+    with open(os.path.expanduser(path), "a") as f:
+        f.write(format_legacy(time.time() if created is None else created, text))
+
+
+class HistoryStore:
+    """SQLite transcript store with an FTS5 index, written by a batching background thread"""
+
+    def __init__(self, path=HISTORY_PATH, flush_seconds=HISTORY_FLUSH_SECONDS):
+        self.path = os.path.expanduser(path)
+        self.flush_seconds = flush_seconds
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " id INTEGER PRIMARY KEY, created REAL NOT NULL, text TEXT NOT NULL,"
+            " audio_seconds REAL, device TEXT, source TEXT, stages TEXT, audio_path TEXT)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries (created)")
+        self.fts = self._create_index()
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.writer = None
+
+    def _create_index(self):
+        """External-content FTS5 index kept in sync by triggers; False if SQLite lacks FTS5"""
+        try:
+            self.db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(text, content='entries', content_rowid='id')"
+            )
+        except sqlite3.OperationalError:
+            print("Warning: SQLite has no FTS5; history search falls back to a full scan")
+            return False
+        self.db.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN"
+            " INSERT INTO entries_fts (rowid, text) VALUES (new.id, new.text); END"
+        )
+        self.db.execute(
+            "CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN"
+            " INSERT INTO entries_fts (entries_fts, rowid, text) VALUES ('delete', old.id, old.text); END"
+        )
+        return True
+
+    def add(self, text, trace=None, created=None):
+        """Queue a transcription for writing; returns at once
+
+        Latencies, audio length, device and audio path come from the
+        dictation's metrics trace when there is one.
+        """
+        record = trace.record() if trace is not None else {}
+        stages = record.get("stages_ms")
+        self.pending.put((
+            time.time() if created is None else created,
+            text,
+            record.get("audio_seconds"),
+            record.get("device"),
+            record.get("source"),
+            json.dumps(stages) if stages else None,
+            record.get("audio_path"),
+        ))
+        with self.lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._write_batches, name="history")
+                self.writer.daemon = True
+                self.writer.start()
+
+    def _write_batches(self):
+        while True:
+            batch = [self.pending.get()]
+            # Gather whatever else arrives shortly, for one commit
+            deadline = time.monotonic() + self.flush_seconds
+            while batch[-1] is not None:
+                try:
+                    batch.append(self.pending.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            if rows:
+                try:
+                    self._insert(rows)
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not write transcript history: {e}")
+            if batch[-1] is None:
+                return
+
+    def _insert(self, rows):
+        with self.lock:
+            self.db.execute("BEGIN")
+            try:
+                self.db.executemany(
+                    "INSERT INTO entries (created, text, audio_seconds, device, source, stages, audio_path)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", rows,
+                )
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def search(self, query, limit=20):
+        """Newest entries matching an FTS5 query (plain words work), as row tuples"""
+        columns = "e.id, e.created, e.text, e.audio_seconds, e.device, e.stages, e.audio_path"
+        with self.lock:
+            if not self.fts:
+                return self.db.execute(
+                    f"SELECT {columns} FROM entries e WHERE e.text LIKE ? ORDER BY e.created DESC LIMIT ?",
+                    (f"%{query}%", limit),
+                ).fetchall()
+            sql = (f"SELECT {columns} FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid"
+                   " WHERE entries_fts MATCH ? ORDER BY e.created DESC LIMIT ?")
+            try:
+                return self.db.execute(sql, (query, limit)).fetchall()
+            except sqlite3.OperationalError:
+                # Not valid query syntax (a stray quote or colon); search the words literally
+                quoted = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+                return self.db.execute(sql, (quoted, limit)).fetchall()
+
+    def recent(self, limit=20):
+        with self.lock:
+            return self.db.execute(
+                "SELECT id, created, text, audio_seconds, device, stages, audio_path"
+                " FROM entries ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+
+    def iter_entries(self, since=None):
+        """(created, text) oldest first, optionally only from a Unix time on"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT created, text FROM entries WHERE created >= ? ORDER BY created", (since or 0,)
+            ).fetchall()
+        return rows
+
+    def stats(self):
+        with self.lock:
+            count, first, last, seconds = self.db.execute(
+                "SELECT COUNT(*), MIN(created), MAX(created), COALESCE(SUM(audio_seconds), 0) FROM entries"
+            ).fetchone()
+        return {"entries": count, "first": first, "last": last, "audio_seconds": round(seconds, 1),
+                "bytes": os.path.getsize(self.path), "fts5": self.fts}
+
+    def close(self):
+        """Write everything still queued, then close the database"""
+        with self.lock:
+            writer = self.writer
+        if writer is not None:
+            self.pending.put(None)
+            writer.join()
+        with self.lock:
+            self.db.close()
+
+
+def open_history():
+    """The configured history store, or None when it is disabled or can't be opened"""
+    if not HISTORY:
+        return None
+    try:
+        return HistoryStore()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: Transcript history unavailable ({e}); continuing without it")
+        return None
+
+
+def import_legacy(store, path):
+    """Load a ~/transcriptions.txt style log; returns the number of entries queued"""
+    with open(os.path.expanduser(path)) as f:
+        content = f.read()
+    count = 0
+    for stamp, text in LEGACY_BLOCK.findall(content):
+        created = time.mktime(time.strptime(stamp, TIMESTAMP_FORMAT))
+        store.add(text, created=created)
+        count += 1
+    return count
+
+
+def _print_rows(rows):
+    for _, created, text, audio_seconds, device, stages, audio_path in rows:
+        details = []
+        if audio_seconds is not None:
+            details.append(f"{audio_seconds:.1f}s")
+        if device:
+            details.append(device)
+        if stages:
+            time_to_text = json.loads(stages).get("time_to_text")
+            if time_to_text is not None:
+                details.append(f"{time_to_text:.0f} ms to text")
+        if audio_path:
+            details.append(audio_path)
+        suffix = f"  ({', '.join(details)})" if details else ""
+        print(f"[{time.strftime(TIMESTAMP_FORMAT, time.localtime(created))}]{suffix}\n{text}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    search = commands.add_parser("search", help="Full-text search, newest first")
+    search.add_argument("query", nargs="+", help="Words, \"phrases\", prefix* or FTS5 syntax")
+    search.add_argument("-n", "--limit", type=int, default=20)
+    recent = commands.add_parser("recent", help="Latest transcriptions")
+    recent.add_argument("-n", "--limit", type=int, default=20)
+    export = commands.add_parser("export", help="Write the history in the legacy text format")
+    export.add_argument("-o", "--output", help="File to write (default: stdout)")
+    export.add_argument("--since", help="Only entries from this date (YYYY-MM-DD) on")
+    legacy = commands.add_parser("import", help="Load a legacy transcriptions.txt")
+    legacy.add_argument("path", nargs="?", default="~/transcriptions.txt")
+    commands.add_parser("stats", help="Entry count, date range and size")
+    args = parser.parse_args()
+
+    store = HistoryStore()
+    try:
+        if args.command == "search":
+            _print_rows(store.search(" ".join(args.query), args.limit))
+        elif args.command == "recent":
+            _print_rows(store.recent(args.limit))
+        elif args.command == "export":
+            since = time.mktime(time.strptime(args.since, "%Y-%m-%d")) if args.since else None
+            out = open(os.path.expanduser(args.output), "w") if args.output else sys.stdout
+            try:
+                for created, text in store.iter_entries(since):
+                    out.write(format_legacy(created, text))
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+        elif args.command == "import":
+            print(f"Imported {import_legacy(store, args.path)} entries from {args.path}")
+        elif args.command == "stats":
+            print(json.dumps(store.stats()))
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
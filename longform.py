@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Long-form transcription: split long recordings at pauses and transcribe the chunks in parallel
+
+A single upload of a long recording is slow and eventually hits the API's
+file-size limit. Recordings longer than LONGFORM_CHUNK_SECONDS are cut at the
+quietest point near each chunk boundary, the chunks are transcribed on a
+pool of workers and the texts are joined back in order. The previous
+chunk's last words are passed along as prompt context so sentences carry
+across cuts when that chunk has already finished; with
+LONGFORM_REPAIR_BOUNDARIES, a chunk whose previous text stops mid-sentence
+is otherwise transcribed again afterwards.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import metrics
+from config import env_bool, env_float, env_int
+from encoders import MAX_UPLOAD_BYTES
+
+# Chunks are at most this long, and cut at a pause in their last third
+LONGFORM_CHUNK_SECONDS = env_float("LONGFORM_CHUNK_SECONDS", 90.0)
+LONGFORM_MIN_CHUNK_SECONDS = env_float("LONGFORM_MIN_CHUNK_SECONDS", 60.0)
+LONGFORM_WORKERS = env_int("LONGFORM_WORKERS", 8)
+# Re-transcribe chunks that started without context when the cut before them split a sentence.
+# Off by default: most chunks start without context, so it nearly doubles the time and billing.
+LONGFORM_REPAIR_BOUNDARIES = env_bool("LONGFORM_REPAIR_BOUNDARIES", False)
+
+# Words of the previous chunk's text passed on as prompt context
+PROMPT_TAIL_WORDS = 30
+
+# A chunk's text ending in one of these (before closing quotes) ends a sentence
+SENTENCE_ENDINGS = (".", "!", "?", "…")
+
+# Energy frames, and the window a pause must fill to count as the quietest point
+FRAME_SECONDS = 0.02
+PAUSE_SECONDS = 0.3
+
+# Room for the WAV header and multipart overhead under the upload limit
+UPLOAD_HEADROOM_BYTES = 64 * 1024
+
+
+def max_chunk_bytes(sample_rate, channels, sample_width=2, max_seconds=LONGFORM_CHUNK_SECONDS):
+    """Largest chunk in PCM bytes, bounded by both duration and the upload limit"""
+    frame_bytes = channels * sample_width
+    by_duration = int(max_seconds * sample_rate) * frame_bytes
+    # Even uncompressed WAV must fit, since the codec is only chosen per chunk
+    by_size = (MAX_UPLOAD_BYTES - UPLOAD_HEADROOM_BYTES) // frame_bytes * frame_bytes
+    return min(by_duration, by_size)
+
+
+def needs_chunking(data, sample_rate, channels, sample_width=2):
+    """True when a recording is too long to send as one upload"""
+    return len(data) > max_chunk_bytes(sample_rate, channels, sample_width)
+
+
+def _pause_energy(data, sample_rate, channels):
+    """Per-frame energy averaged over a pause-length window, plus the frame size in samples"""
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    samples = np.frombuffer(data, dtype=np.int16).reshape(-1, channels)
+    n_frames = len(samples) // frame
+    mono = samples[:n_frames * frame].astype(np.float32).mean(axis=1)
+    energy = (mono.reshape(n_frames, frame) ** 2).mean(axis=1)
+    window = max(1, int(PAUSE_SECONDS / FRAME_SECONDS))
+    smoothed = np.convolve(energy, np.ones(window) / window, mode="same")
+    return smoothed, frame
+
+
+def split_at_pauses(data, sample_rate, channels, sample_width=2,
+                    max_seconds=LONGFORM_CHUNK_SECONDS, min_seconds=LONGFORM_MIN_CHUNK_SECONDS):
+    """Cut 16-bit PCM into chunks no longer than max_seconds, at the quietest point after min_seconds
+
+    Returns zero-copy memoryviews over ``data``.
+    """
+    view = memoryview(data).cast("B")
+    frame_bytes = channels * sample_width
+    max_bytes = max_chunk_bytes(sample_rate, channels, sample_width, max_seconds)
+    if len(view) <= max_bytes:
+        return [view]
+
+    energy, frame = _pause_energy(view, sample_rate, channels)
+    frame_step = frame * frame_bytes
+    max_frames = max(1, max_bytes // frame_step)
+    min_frames = min(max_frames, int(min_seconds / FRAME_SECONDS))
+
+    chunks = []
+    start = 0
+    while len(view) - start * frame_step > max_bytes:
+        window = energy[start + min_frames:start + max_frames]
+        cut = start + min_frames + int(np.argmin(window)) if len(window) else start + max_frames
+        chunks.append(view[start * frame_step:cut * frame_step])
+        start = cut
+    chunks.append(view[start * frame_step:])
+    return chunks
+
+
+def tail_text(text, words=PROMPT_TAIL_WORDS):
+    """Last few words of a transcript, for use as prompt context"""
+    if not text:
+        return None
+    return " ".join(text.split()[-words:])
+
+
+def ends_sentence(text):
+    """True when a transcript stops at the end of a sentence"""
+    return text.rstrip().rstrip("\"')]").endswith(SENTENCE_ENDINGS)
+
+
+def transcribe_long(data, sample_rate, channels, transcribe_chunk, workers=LONGFORM_WORKERS,
+                    sample_width=2, raise_errors=False, repair=LONGFORM_REPAIR_BOUNDARIES):
+    """Transcribe a long recording chunk by chunk in parallel and return the joined text
+
+    ``transcribe_chunk(pcm, context)`` turns one chunk into text (or None);
+    ``context`` is the end of the previous chunk's transcript, or None. A
+    chunk submitted before the previous one finished starts without it and,
+    with ``repair``, is transcribed again with it if the previous text stops
+    mid-sentence. A failed chunk is left out of the text, or with
+    ``raise_errors`` its exception is raised once every chunk has finished.
+    """
+    chunks = split_at_pauses(data, sample_rate, channels, sample_width)
+    if len(chunks) == 1:
+        return transcribe_chunk(chunks[0], None)
+
+    workers = max(1, min(workers, len(chunks)))
+    seconds = len(data) / (sample_rate * channels * sample_width)
+    print(f"Long recording ({seconds:.0f}s): {len(chunks)} chunks on {workers} workers")
+
+    texts = [None] * len(chunks)
+    had_context = [False] * len(chunks)
+    finished = [threading.Event() for _ in chunks]
+    errors = []
+
+    def _transcribe(index):
+        # Never wait for the previous chunk; that would serialise the pool
+        context = tail_text(texts[index - 1]) if index and finished[index - 1].is_set() else None
+        had_context[index] = context is not None
+        try:
+            texts[index] = transcribe_chunk(chunks[index], context)
+        except Exception as e:
+            print(f"Chunk {index + 1} transcription error: {e}")
+            errors.append(e)
+        finally:
+            finished[index].set()
+
+    def _repair(index, context):
+        # Keep the first text if this one fails; the chunk was transcribed already
+        try:
+            text = transcribe_chunk(chunks[index], context)
+        except Exception as e:
+            print(f"Chunk {index + 1} re-transcription error: {e}")
+            return
+        if text:
+            texts[index] = text
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="longform") as executor:
+        # Chunk requests count towards the caller's trace
+        list(executor.map(metrics.wrap(_transcribe), range(len(chunks))))
+        if errors and raise_errors:
+            raise errors[0]
+        broken = [
+            index for index in range(1, len(chunks))
+            if repair and not had_context[index] and texts[index] and texts[index - 1]
+            and not ends_sentence(texts[index - 1])
+        ]
+        if broken:
+            print(f"Re-transcribing {len(broken)} chunks that start mid-sentence, with context")
+            contexts = [tail_text(texts[index - 1]) for index in broken]
+            list(executor.map(metrics.wrap(_repair), broken, contexts))
+
+    missing = sum(1 for text in texts if not text)
+    if missing:
+        print(f"Warning: {missing} of {len(chunks)} chunks produced no text")
+    return " ".join(text.strip() for text in texts if text) or None
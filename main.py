@@ -1,75 +1,67 @@
+import startup_profile  # First, so --profile-startup can time the imports below
+import argparse
 import os
-import tempfile
-import wave
-import pyaudio
 import keyboard
-import pyautogui
-import pyperclip
-from groq import Groq
+import metrics
 from dotenv import load_dotenv
 import time
+from config import env_bool, env_float
+from audio_engine import AudioEngine
+from audio_processing import preprocess_pcm
+from groq_client import create_client, prewarm
+from transcription_queue import TranscriptionQueue
+from streaming import LiveTranscriber, SpeculativeTranscriber
+from vad import apply_vad
+from engines import create_engine
+from output_sinks import create_sink
+from history import append_text_file, open_history
 
 # Load environment variables
 load_dotenv()
 
-# Set up Groq client
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Groq client on a pooled keep-alive connection, created on first use
+client = None
 
+# Transcription engine router (Groq, local model or both), created on first use
+router = None
 
-def list_audio_devices():
+# Where transcriptions are pasted or typed, created on first use
+sink = None
+
+# Searchable transcript history (False when disabled), opened on first use
+history = None
+
+# Safety stop in case the key release is missed; long recordings are chunked for upload
+MAX_RECORDING_SECONDS = env_float("MAX_RECORDING_SECONDS", 120)
+
+# Preview the text while PAUSE is held and paste settled segments as they come
+LIVE_TRANSCRIPTION = env_bool("LIVE_TRANSCRIPTION")
+
+# Start transcribing at pauses while PAUSE is still held, in case speech has ended
+SPECULATIVE_TRANSCRIPTION = env_bool("SPECULATIVE_TRANSCRIPTION")
+
+
+def get_client():
     """
-    List all available audio input devices
+    Create the Groq client on first use; importing groq is most of cold start.
     """
-    p = pyaudio.PyAudio()
-    info = []
-    print("\nAvailable Audio Input Devices:")
-    print("-" * 60)
-    for i in range(p.get_device_count()):
-        dev_info = p.get_device_info_by_index(i)
-        if dev_info.get('maxInputChannels') > 0:  # Only input devices
-            print(f"Index {i}: {dev_info.get('name')}")
-            info.append(dev_info)
-    print("-" * 60)
-    p.terminate()
-    return info
+    global client
+    if client is None:
+        with startup_profile.phase("API client"):
+            client = create_client()
+    return client
 
 
-def record_audio(sample_rate=48000, channels=2, chunk=1024, input_device_index=None):
+def record_audio(engine, on_chunk=None, trace=None):
     """
     Record audio from the microphone while the PAUSE button is held down.
-    """
-    p = pyaudio.PyAudio()
-    
-    # If no input device specified, try to find a default one
-    if input_device_index is None:
-        for i in range(p.get_device_count()):
-            dev_info = p.get_device_info_by_index(i)
-            if dev_info.get('maxInputChannels') > 0:
-                input_device_index = i
-                break
-    
-    # Get device info and print it for debugging
-    try:
-        device_info = p.get_device_info_by_index(input_device_index)
-        print(f"\nDevice Info for index {input_device_index}:")
-        print(f"Name: {device_info.get('name')}")
-        print(f"Max Input Channels: {device_info.get('maxInputChannels')}")
-        print(f"Default Sample Rate: {device_info.get('defaultSampleRate')}")
-    except Exception as e:
-        print(f"Error getting device info: {e}")
-    
-    stream = p.open(
-        format=pyaudio.paInt16,
-        channels=channels,
-        rate=sample_rate,
-        input=True,
-        frames_per_buffer=chunk,
-        input_device_index=input_device_index,
-        stream_callback=None
-    )
 
+    The engine's stream is already open (and, with pre-roll, already
+    listening), so the recording includes the moment the key went down.
+    ``on_chunk`` is passed on to the engine to see audio as it is captured.
+    ``trace``, if given, is marked at the trigger, first frame and stop.
+    """
     print("Press and hold the PAUSE button to start recording...")
-    frames = []
     
     # Make sure keyboard module is in a clean state
     try:
@@ -79,85 +71,183 @@ def record_audio(sample_rate=48000, channels=2, chunk=1024, input_device_index=N
     
     try:
         keyboard.wait("pause")  # Wait for PAUSE button to be pressed
+        if trace is not None:
+            trace.mark("trigger")
+        engine.start(on_chunk=on_chunk)
+        # Open the API connection while the user is still talking
+        prewarm(get_client())
         print("Recording... (Release PAUSE to stop)")
 
-        # Set a maximum recording time to prevent hanging if keyboard events fail
-        max_recording_time = 60  # seconds
+        # Maximum recording time prevents hanging if keyboard events fail
         start_time = time.time()
         
-        while keyboard.is_pressed("pause") and (time.time() - start_time) < max_recording_time:
-            try:
-                data = stream.read(chunk, exception_on_overflow=False)
-                frames.append(data)
-            except OSError as e:
-                print(f"Warning: {str(e)}")
-                continue
+        # Capture happens on PortAudio's callback thread; we only watch the key
+        while keyboard.is_pressed("pause") and (time.time() - start_time) < MAX_RECORDING_SECONDS:
+            time.sleep(0.01)
     except Exception as e:
         print(f"Keyboard error: {str(e)}")
         # If keyboard module fails, add a fallback recording option
         print("Keyboard detection failed. Recording for 5 seconds...")
-        for _ in range(int(5 * sample_rate / chunk)):  # Record for 5 seconds
-            try:
-                data = stream.read(chunk, exception_on_overflow=False)
-                frames.append(data)
-            except OSError as e:
-                print(f"Warning: {str(e)}")
-                continue
+        if trace is not None:
+            trace.mark("trigger")
+        engine.start(on_chunk=on_chunk)
+        time.sleep(5)
 
     print("Recording finished.")
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
+    audio = engine.stop()
+    if trace is not None:
+        trace.mark("stop")
+        trace.device = engine.device_name()
+        if engine.first_frame_at is not None:
+            trace.mark("first_frame", engine.first_frame_at)
+        trace.audio_seconds = len(audio) / (engine.sample_rate * engine.channels * 2)
 
-    return frames, sample_rate
+    return audio, engine.sample_rate, engine.channels
 
 
-def save_audio(frames, sample_rate):
+def get_engine():
     """
-    Save recorded audio to a temporary WAV file.
+    Create the transcription engine router on first use.
     """
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_audio:
-        wf = wave.open(temp_audio.name, "wb")
-        wf.setnchannels(2)  # Stereo
-        wf.setsampwidth(pyaudio.PyAudio().get_sample_size(pyaudio.paInt16))
-        wf.setframerate(sample_rate)
-        wf.writeframes(b"".join(frames))
-        wf.close()
-        return temp_audio.name
+    global router
+    if router is None:
+        router = create_engine(get_client)
+    return router
 
 
-def transcribe_audio(audio_file_path):
+def get_sink():
     """
-    Transcribe audio using Groq's Whisper implementation.
+    Create the output sink chosen by OUTPUT_SINK on first use.
     """
-    try:
-        with open(audio_file_path, "rb") as file:
-            transcription = client.audio.transcriptions.create(
-                file=(os.path.basename(audio_file_path), file.read()),
-                model="whisper-large-v3-turbo",  # Using turbo model for potentially faster responses
-                prompt="""Australian software developer using British/Australian spelling (colour, optimise, centre).
-                Context: Python programming, technical discussions.
-                Expected content:
-                - Programming terms (Python, Git, Docker)
-                - Code syntax and commands
-                - File paths (/home/user/, .py, .env)
-                - Technical jargon and package names
-                Please transcribe symbols exactly ('underscore' for _, 'dot' for .) and maintain proper capitalisation of technical terms.""",
-                response_format="text",
-                language="en",
-            )
-        return transcription  # This is now directly the transcription text
-    except Exception as e:
-        print(f"An error occurred: {str(e)}")
+    global sink
+    if sink is None:
+        sink = create_sink()
+    return sink
+
+
+def get_history():
+    """
+    Open the transcript history store on first use; None when disabled.
+    """
+    global history
+    if history is None:
+        history = open_history() or False
+    return history or None
+
+
+def save_transcription(transcription, trace=None):
+    """
+    Add an output transcription to the history; the write happens in the background.
+    """
+    store = get_history()
+    if store is not None:
+        store.add(transcription, trace)
+    append_text_file(transcription)
+
+
+def process_recording(recording):
+    """
+    Turn one finished recording into text; runs on a transcription worker.
+
+    Returns the text (or None) and the recording's trace.
+    """
+    audio, sample_rate, channels, trace, speculation = recording
+    with trace.active():
+        transcription = speculation.finish() if speculation is not None else None
+        if not transcription:
+            transcription = transcribe_recording(audio, sample_rate, channels)
+        return transcription, trace
+
+
+def transcribe_recording(audio, sample_rate, channels):
+    """
+    Preprocess, trim and transcribe raw PCM from the microphone.
+    """
+    # Downmix and resample to what Whisper actually consumes
+    audio, sample_rate, channels = preprocess_pcm(audio, sample_rate, channels)
+    print(f"Upload format: {sample_rate}Hz, {channels} channel(s), {len(audio)} bytes")
+    
+    # Trim silence; accidental taps with no speech never reach the API
+    audio = apply_vad(audio, sample_rate, channels)
+    if audio is None:
         return None
+    
+    # Short clips may stay local; long ones go to Groq as parallel chunks
+    return get_engine().transcribe(audio, sample_rate, channels)
+
+
+def create_speculation(engine, trace=None):
+    """
+    Speculative transcriber for one recording on this engine.
+
+    Pauses only trigger a request while the rate-limit budget has room to
+    spare, so speculation never delays real transcriptions.
+    """
+    sample_rate, channels = engine.sample_rate, engine.channels
+    return SpeculativeTranscriber(
+        lambda audio: transcribe_recording(audio, sample_rate, channels),
+        engine.snapshot,
+        sample_rate,
+        channels,
+        allowed=lambda: get_engine().remote.scheduler.has_spare(),
+        trace=trace,
+    )
+
+
+def preview_recording(audio, sample_rate, channels):
+    """
+    Quick, uncached transcription of audio still being recorded, or None.
+    """
+    audio, sample_rate, channels = preprocess_pcm(audio, sample_rate, channels)
+    return get_engine().transcribe_partial(audio, sample_rate, channels)
 
 
-def copy_transcription_to_clipboard(text):
+def record_live(engine):
     """
-    Copy the transcribed text to clipboard using pyperclip.
+    Record one dictation in live mode and return its final text.
+
+    Segments are transcribed and pasted while the key is still held, so on
+    release only the last few seconds are left.
+    """
+    sample_rate, channels = engine.sample_rate, engine.channels
+    trace = metrics.Trace("main")
+    live = LiveTranscriber(
+        lambda segment: transcribe_recording(segment, sample_rate, channels),
+        lambda tail: preview_recording(tail, sample_rate, channels),
+        sample_rate,
+        channels,
+        on_commit=get_sink().write,
+        trace=trace,
+    )
+    try:
+        record_audio(engine, on_chunk=live.feed, trace=trace)
+    finally:
+        # Also stops the preview thread if recording failed
+        transcription = live.finish()
+    # Committed segments were output as they came, so this is when the last one landed
+    if transcription:
+        trace.mark("delivered")
+        save_transcription(transcription, trace)
+    trace.finish(delivered=bool(transcription))
+    return transcription
+
+
+def deliver_transcription(result):
     """
-    pyperclip.copy(text)
-    pyautogui.hotkey("ctrl", "v")
+    Paste a finished transcription; called in recording order.
+    """
+    transcription, trace = result or (None, None)
+    if transcription:
+        print("\nTranscription:")
+        print(transcription)
+        get_sink().write(transcription)
+        if trace is not None:
+            trace.mark("delivered")
+        save_transcription(transcription, trace)
+    else:
+        print("No transcription for this recording.")
+    if trace is not None:
+        trace.finish(delivered=bool(transcription))
 
 
 def main():
@@ -166,52 +256,48 @@ def main():
     retry_count = 0
     retry_delay = 5  # seconds
     
+    engine = None
+    
+    # Network round-trips happen here, off the capture loop; results arrive in order
+    transcriptions = TranscriptionQueue(process_recording, deliver_transcription)
+    # Load a local model (if the policy uses one) while waiting for the first recording
+    get_engine().warm()
+    
     while retry_count < max_retries:
         try:
-            # First list available devices
-            list_audio_devices()
-            
             # Use the configured microphone index from environment variables, or default to None
             AUDIO_DEVICE_INDEX = os.getenv("AUDIO_DEVICE_INDEX")
             if AUDIO_DEVICE_INDEX is not None:
                 AUDIO_DEVICE_INDEX = int(AUDIO_DEVICE_INDEX)
             
+            # PortAudio init and device probing happen once, not per recording
+            engine = AudioEngine(input_device_index=AUDIO_DEVICE_INDEX).open()
+            engine.list_devices()
+            
             # Inner loop for continuous operation
             while True:
                 try:
                     # Record audio
                     if AUDIO_DEVICE_INDEX is not None:
                         print(f"\nUsing input device index {AUDIO_DEVICE_INDEX}")
-                    frames, sample_rate = record_audio(input_device_index=AUDIO_DEVICE_INDEX)
+                    if LIVE_TRANSCRIPTION:
+                        # Already output segment by segment; just show the result
+                        transcription = record_live(engine)
+                        print(f"\nTranscription:\n{transcription or '(none)'}")
+                        print("\nReady for next recording. Press PAUSE to start.")
+                        continue
+                    trace = metrics.Trace("main")
+                    speculation = create_speculation(engine, trace) if SPECULATIVE_TRANSCRIPTION else None
+                    audio, sample_rate, channels = record_audio(
+                        engine, on_chunk=speculation.feed if speculation is not None else None, trace=trace,
+                    )
 
                     # Add debug info about the recorded audio
-                    print(f"Recorded {len(frames)} frames at {sample_rate}Hz")
-                    if frames and len(frames) > 0:
-                        print(f"First frame size: {len(frames[0])} bytes")
+                    seconds = len(audio) / (sample_rate * channels * 2)
+                    print(f"Recorded {seconds:.1f}s ({len(audio)} bytes) at {sample_rate}Hz")
                     
-                    # Save audio to temporary file
-                    temp_audio_file = save_audio(frames, sample_rate)
-                    print(f"Saved audio to temporary file: {temp_audio_file}")
-
-                    # Transcribe audio
-                    print("Transcribing...")
-                    transcription = transcribe_audio(temp_audio_file)
-
-                    # Copy transcription to clipboard
-                    if transcription:
-                        print("\nTranscription:")
-                        print(transcription)
-                        print("Copying transcription to clipboard...")
-                        copy_transcription_to_clipboard(transcription)
-                        print("Transcription copied to clipboard and pasted into the application.")
-                    else:
-                        print("Transcription failed.")
-
-                    # Clean up temporary file
-                    try:
-                        os.unlink(temp_audio_file)
-                    except Exception as e:
-                        print(f"Warning: Failed to delete temporary file: {e}")
+                    # Hand off to the workers so the next recording can start right away
+                    transcriptions.submit((audio, sample_rate, channels, trace, speculation))
 
                     print("\nReady for next recording. Press PAUSE to start.")
                     
@@ -219,6 +305,8 @@ def main():
                     # Inner try-except for handling device errors in a single recording cycle
                     print(f"\nError during recording cycle: {str(e)}")
                     print("Continuing to next recording...")
+                    # The device may have been unplugged or replaced
+                    engine.refresh()
                     continue
                     
         except Exception as e:
@@ -232,6 +320,9 @@ def main():
                 keyboard.unhook_all()
             except:
                 pass
+            if engine is not None:
+                engine.close()
+                engine = None
                 
             import time
             time.sleep(retry_delay)
@@ -244,7 +335,38 @@ def main():
                 break
                 
             print("Restarting audio recording service...")
+    
+    # Let recordings already handed off finish before exiting
+    transcriptions.close()
+    if history:
+        history.close()
+
+
+def profile_startup(as_json=False, import_only=False):
+    """
+    Walk the startup path up to the first captured frame and report timings.
+    """
+    get_client()
+    if not import_only:
+        AUDIO_DEVICE_INDEX = os.getenv("AUDIO_DEVICE_INDEX")
+        if AUDIO_DEVICE_INDEX is not None:
+            AUDIO_DEVICE_INDEX = int(AUDIO_DEVICE_INDEX)
+        # No pre-roll, so the stream only starts when asked and first-frame time is real
+        engine = AudioEngine(input_device_index=AUDIO_DEVICE_INDEX, preroll_seconds=0).open()
+        startup_profile.measure_first_frame(engine)
+        engine.close()
+    startup_profile.report(as_json)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Hold PAUSE to dictate; text is pasted at the cursor")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report import and startup phase timings instead of running")
+    parser.add_argument("--json", action="store_true", help="Print the startup profile as JSON")
+    parser.add_argument("--import-only", action="store_true",
+                        help="Profile imports and client setup only, without audio hardware")
+    args = parser.parse_args()
+    if args.profile_startup:
+        profile_startup(args.json, args.import_only)
+    else:
+        main()
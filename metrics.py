@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""Per-dictation stage timings, rolling histograms and their export
+
+A ``Trace`` follows one dictation from the trigger to the text appearing at
+the cursor, marking each pipeline stage as it is reached. Code deep in the
+pipeline (encoding, the API request) marks whichever trace is active on its
+thread, so a trace only has to be handed on by hand where work changes
+threads. Finished traces feed rolling histograms per stage and, when
+configured, are appended to a JSON lines file; the histograms are also
+written as a Prometheus textfile for node_exporter's textfile collector.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import env_int, env_str
+
+# One JSON object per dictation is appended here (off unless set)
+METRICS_JSONL = env_str("METRICS_JSONL")
+# Prometheus text exposition file, rewritten after every dictation (off unless set)
+METRICS_PROMETHEUS_FILE = env_str("METRICS_PROMETHEUS_FILE")
+# Recent samples kept per histogram for the percentiles in status and summaries
+METRICS_WINDOW = env_int("METRICS_WINDOW", 1000)
+
+PROMETHEUS_PREFIX = "groq_whisperer"
+
+# Pipeline marks in the order a dictation normally reaches them
+MARKS = ("trigger", "first_frame", "stop", "encoded", "request_sent", "response_received", "delivered")
+
+# Chunked and streamed recordings send several requests; the stage ends with the last reply
+LAST_WINS = ("response_received",)
+
+# (stage, from mark, to mark); a stage is skipped when either mark is missing or out of order
+STAGES = (
+    ("capture_start", "trigger", "first_frame"),  # Cold start or stream start
+    ("recording", "first_frame", "stop"),
+    ("encode", "stop", "encoded"),  # Preprocessing, VAD and encoding the upload
+    ("queue", "encoded", "request_sent"),  # Waiting on the rate limiter
+    ("inference", "request_sent", "response_received"),  # Upload plus model time
+    ("output", "response_received", "delivered"),  # Paste or typing
+    ("time_to_text", "stop", "delivered"),
+)
+
+# Histogram bucket bounds in seconds; recordings themselves run to minutes
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Histogram families: label name and help text
+FAMILIES = {
+    "stage_seconds": ("stage", "Time spent in each stage of a dictation"),
+    "request_seconds": ("engine", "Latency of individual transcription requests"),
+}
+
+_lock = threading.Lock()
+_histograms = {}
+_totals = {"dictations": 0, "upload_bytes": 0, "audio_seconds": 0.0}
+_local = threading.local()
+
+
+class Histogram:
+    """Cumulative bucket counts for Prometheus plus the latest samples for percentiles"""
+
+    def __init__(self, buckets=BUCKETS, window=METRICS_WINDOW):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=max(1, window))
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def percentile(self, q):
+        """Nearest-rank percentile (0-1) of the recent samples, or None"""
+        values = sorted(self.recent)
+        if not values:
+            return None
+        return values[max(0, math.ceil(q * len(values)) - 1)]
+
+    def summary(self):
+        ms = lambda value: round(value * 1000, 1)
+        return {
+            "count": self.count,
+            "p50_ms": ms(self.percentile(0.5)),
+            "p95_ms": ms(self.percentile(0.95)),
+            "max_ms": ms(max(self.recent)),
+        }
+
+
+class Trace:
+    """Timestamps for one dictation's pipeline stages, plus what it recorded and uploaded"""
+
+    def __init__(self, source):
+        self.source = source
+        self.marks = {}
+        self.upload_bytes = 0
+        self.audio_seconds = None
+        self.device = None
+        self.audio_path = None  # Archived copy of the (first) upload, if any
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def mark(self, name, at=None):
+        """Record reaching a stage now (or at a perf_counter time); the first mark wins"""
+        at = time.perf_counter() if at is None else at
+        with self.lock:
+            if name in LAST_WINS or name not in self.marks:
+                self.marks[name] = at
+
+    def add_upload(self, num_bytes):
+        with self.lock:
+            self.upload_bytes += num_bytes
+
+    @contextmanager
+    def active(self):
+        """Make this the trace that pipeline code on the current thread marks"""
+        previous = getattr(_local, "trace", None)
+        _local.trace = self
+        try:
+            yield self
+        finally:
+            _local.trace = previous
+
+    def stages(self):
+        """Seconds spent in each stage that has both of its marks"""
+        with self.lock:
+            marks = dict(self.marks)
+        durations = {}
+        for stage, begin, end in STAGES:
+            if begin in marks and end in marks and marks[end] >= marks[begin]:
+                durations[stage] = marks[end] - marks[begin]
+        return durations
+
+    def record(self):
+        """The trace as a JSON-ready dict; marks are in ms since the trigger"""
+        with self.lock:
+            marks = dict(self.marks)
+        origin = marks.get("trigger", min(marks.values(), default=time.perf_counter()))
+        return {
+            "time": round(time.time() - (time.perf_counter() - origin), 3),
+            "source": self.source,
+            "marks_ms": {name: round((marks[name] - origin) * 1000, 1) for name in MARKS if name in marks},
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in self.stages().items()},
+            "upload_bytes": self.upload_bytes,
+            "audio_seconds": round(self.audio_seconds, 2) if self.audio_seconds is not None else None,
+            "device": self.device,
+            "audio_path": self.audio_path,
+        }
+
+    def finish(self, delivered=True):
+        """Close the trace: fold it into the histograms, export it and print the timings"""
+        if delivered:
+            self.mark("delivered")
+        with self.lock:
+            if self.finished:
+                return None
+            self.finished = True
+        stages = self.stages()
+        with _lock:
+            for stage, seconds in stages.items():
+                _histogram("stage_seconds", stage).observe(seconds)
+            _totals["dictations"] += 1
+            _totals["upload_bytes"] += self.upload_bytes
+            _totals["audio_seconds"] += self.audio_seconds or 0.0
+        record = self.record()
+        if METRICS_JSONL:
+            _append_jsonl(METRICS_JSONL, record)
+        export()
+        timings = ", ".join(f"{stage} {ms:.0f}" for stage, ms in record["stages_ms"].items())
+        print(f"Stage timings (ms): {timings or 'none'}")
+        return record
+
+
+def _histogram(family, label):
+    """Histogram for one label of a family; call with _lock held"""
+    key = (family, label)
+    if key not in _histograms:
+        _histograms[key] = Histogram()
+    return _histograms[key]
+
+
+def current():
+    """The trace active on this thread, or None"""
+    return getattr(_local, "trace", None)
+
+
+def mark(name):
+    """Mark a stage on the active trace, if any"""
+    trace = current()
+    if trace is not None:
+        trace.mark(name)
+
+
+class _UploadsOnly:
+    """Stand-in trace that passes uploads on to a real one and ignores marks"""
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def mark(self, name, at=None):
+        pass
+
+    def add_upload(self, num_bytes):
+        self.trace.add_upload(num_bytes)
+
+    active = Trace.active
+
+
+def wrap(function, trace=None, marks=True):
+    """``function`` run with ``trace`` (default: the active one) active, for another thread
+
+    With ``marks`` off only its uploads are counted, e.g. for a duplicate
+    request whose caller marks the stages itself.
+    """
+    trace = trace or current()
+    if trace is None:
+        return function
+    if not marks:
+        trace = _UploadsOnly(trace)
+
+    def _traced(*args, **kwargs):
+        with trace.active():
+            return function(*args, **kwargs)
+    return _traced
+
+
+def record_request(engine, seconds, num_bytes=0):
+    """Count one transcription request against the histograms and the active trace"""
+    with _lock:
+        _histogram("request_seconds", engine).observe(seconds)
+    trace = current()
+    if trace is not None and num_bytes:
+        trace.add_upload(num_bytes)
+
+
+def summary():
+    """Totals and recent percentiles for every histogram, e.g. for a status reply"""
+    with _lock:
+        result = dict(_totals, audio_seconds=round(_totals["audio_seconds"], 2))
+        for (family, label), histogram in sorted(_histograms.items()):
+            result.setdefault(family, {})[label] = histogram.summary()
+    return result
+
+
+def _append_jsonl(path, record):
+    path = os.path.expanduser(path)
+    try:
+        with _lock, open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"Warning: Could not write metrics to {path}: {e}")
+
+
+def prometheus_text():
+    """All histograms and totals in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for family, (label, help_text) in FAMILIES.items():
+            name = f"{PROMETHEUS_PREFIX}_{family}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (key, value), histogram in sorted(_histograms.items()):
+                if key != family:
+                    continue
+                labels = f'{label}="{value}"'
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        for total, help_text in (
+            ("dictations", "Dictations traced from trigger to output"),
+            ("upload_bytes", "Audio bytes uploaded for traced dictations"),
+            ("audio_seconds", "Seconds of audio recorded in traced dictations"),
+        ):
+            name = f"{PROMETHEUS_PREFIX}_{total}_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {round(_totals[total], 3)}")
+    return "\n".join(lines) + "\n"
+
+
+def export(path=None):
+    """Rewrite the Prometheus textfile, atomically so a scrape never sees half of it"""
+    path = path or METRICS_PROMETHEUS_FILE
+    if not path:
+        return
+    path = os.path.expanduser(path)
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            f.write(prometheus_text())
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        print(f"Warning: Could not write metrics to {path}: {e}")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Where finished transcriptions go: pasted, typed or printed
+
+``paste`` puts the text on the clipboard, sends one paste keystroke and then
+puts the previous clipboard text back, so even long transcripts appear at
+once. ``type`` sends keystrokes through xdotool in chunks, which suits text
+that arrives a piece at a time and applications that ignore paste. ``print``
+only writes to stdout. Every sink times its writes.
+"""
+import shutil
+import subprocess
+import threading
+import time
+
+from config import env_float, env_int, env_str
+
+OUTPUT_SINK = env_str("OUTPUT_SINK", "paste").lower()
+
+# Keystroke that pastes in the target application (ctrl+shift+v for most terminals)
+OUTPUT_PASTE_KEYS = env_str("OUTPUT_PASTE_KEYS", "ctrl+v")
+# The application reads the clipboard after the keystroke; restore only after this long
+OUTPUT_RESTORE_DELAY = env_float("OUTPUT_RESTORE_DELAY", 0.3)
+
+# Characters per xdotool call and the delay between keystrokes within one
+OUTPUT_TYPE_CHUNK = env_int("OUTPUT_TYPE_CHUNK", 200)
+OUTPUT_TYPE_DELAY_MS = env_int("OUTPUT_TYPE_DELAY_MS", 0)
+
+
+class OutputSink:
+    """Base class: ``write`` delivers text at the cursor and records how long it took"""
+
+    name = "sink"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.chars = 0
+        self.seconds = 0.0
+
+    def write(self, text):
+        """Deliver text; returns True on success"""
+        if not text:
+            return True
+        start = time.perf_counter()
+        try:
+            self._write(text)
+            ok = True
+        except Exception as e:
+            print(f"Error writing text via {self.name}: {e}")
+            ok = False
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.writes += 1
+            self.chars += len(text)
+            self.seconds += elapsed
+        print(f"Output via {self.name}: {len(text)} chars in {elapsed * 1000:.0f} ms")
+        return ok
+
+    def _write(self, text):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def stats(self):
+        with self.lock:
+            return {"sink": self.name, "writes": self.writes, "chars": self.chars,
+                    "seconds": round(self.seconds, 4)}
+
+
+class PrintSink(OutputSink):
+    """Write to stdout only, e.g. headless or in benchmarks"""
+
+    name = "print"
+
+    def _write(self, text):
+        print(text)
+
+
+class TypeSink(OutputSink):
+    """Type through xdotool, a chunk of characters per call
+
+    Each call is one process start plus a keystroke per character, so this is
+    slower than pasting for long text, but it can be fed partial results as
+    they arrive and works where paste is blocked.
+    """
+
+    name = "type"
+
+    def __init__(self, chunk=OUTPUT_TYPE_CHUNK, delay_ms=OUTPUT_TYPE_DELAY_MS):
+        super().__init__()
+        self.chunk = max(1, chunk)
+        self.delay_ms = delay_ms
+
+    def _write(self, text):
+        for start in range(0, len(text), self.chunk):
+            # --clearmodifiers so a still-held hotkey modifier doesn't mangle the text
+            subprocess.run([
+                'xdotool', 'type', '--clearmodifiers', '--delay', str(self.delay_ms),
+                text[start:start + self.chunk],
+            ], check=True)
+
+
+class PasteSink(OutputSink):
+    """Set the clipboard, send one paste keystroke, then restore the old clipboard text"""
+
+    name = "paste"
+
+    def __init__(self, keys=OUTPUT_PASTE_KEYS, restore_delay=OUTPUT_RESTORE_DELAY):
+        super().__init__()
+        self.keys = keys
+        self.restore_delay = restore_delay
+        self.saved = None  # The user's clipboard text, until it is put back
+        self.timer = None
+
+    def _send_keys(self):
+        if shutil.which("xdotool"):
+            subprocess.run(['xdotool', 'key', '--clearmodifiers', self.keys], check=True)
+        else:
+            # GUI automation libraries are slow to import and only needed here
+            import pyautogui
+            pyautogui.hotkey(*self.keys.split("+"))
+
+    def _write(self, text):
+        import pyperclip
+
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            saved = self.saved
+        # Back-to-back pastes: the clipboard holds our last text, not the user's
+        if saved is None:
+            saved = _read_clipboard(pyperclip)
+        pyperclip.copy(text)
+        self._send_keys()
+        if saved is None or self.restore_delay < 0:
+            return
+        timer = threading.Timer(self.restore_delay, self._restore, args=(pyperclip, text))
+        timer.daemon = True
+        with self.lock:
+            self.saved = saved
+            self.timer = timer
+        timer.start()
+
+    def _restore(self, pyperclip, pasted):
+        with self.lock:
+            saved, self.saved = self.saved, None
+            self.timer = None
+        # Leave it alone if something else was copied in the meantime
+        if saved is not None and _read_clipboard(pyperclip) == pasted:
+            pyperclip.copy(saved)
+
+    def close(self):
+        """Wait for a pending clipboard restore, e.g. before the process exits"""
+        with self.lock:
+            timer = self.timer
+        if timer is not None:
+            timer.join()
+
+
+def _read_clipboard(pyperclip):
+    """Current clipboard text, or None when it holds nothing we can put back"""
+    try:
+        return pyperclip.paste()
+    except Exception:
+        return None
+
+
+SINKS = {
+    "paste": PasteSink,
+    "type": TypeSink,
+    "print": PrintSink,
+}
+
+
+def create_sink(name=OUTPUT_SINK):
+    """Sink by name, falling back to paste for unknown names"""
+    if name not in SINKS:
+        print(f"Warning: Unknown OUTPUT_SINK '{name}', using paste")
+        name = "paste"
+    return SINKS[name]()
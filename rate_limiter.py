@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Client-side rate limiting and retries for Groq requests
+
+Groq limits both requests per minute and audio seconds per hour (each
+request is billed for at least ten seconds). ``RequestScheduler`` keeps a
+token bucket for each budget, so bursts queue up locally instead of being
+rejected, and retries the individual request on 429s (honouring
+Retry-After), server errors and dropped connections with jittered
+exponential backoff.
+"""
+import random
+import threading
+import time
+
+from config import env_float, env_int
+
+# Local budgets; 0 disables a limit. Defaults match the free tier for Whisper models
+GROQ_REQUESTS_PER_MINUTE = env_float("GROQ_REQUESTS_PER_MINUTE", 20)
+GROQ_AUDIO_SECONDS_PER_HOUR = env_float("GROQ_AUDIO_SECONDS_PER_HOUR", 7200)
+# Most of the audio budget optional requests (live previews) may use, refilled over the hour
+GROQ_PREVIEW_BUDGET_SHARE = env_float("GROQ_PREVIEW_BUDGET_SHARE", 0.25)
+
+GROQ_RETRY_ATTEMPTS = env_int("GROQ_RETRY_ATTEMPTS", 5)
+# First retry delay; doubled on every attempt and jittered
+GROQ_RETRY_BACKOFF_SECONDS = env_float("GROQ_RETRY_BACKOFF_SECONDS", 1.0)
+MAX_BACKOFF_SECONDS = 60.0
+
+# Groq bills shorter requests as this many seconds of audio
+MIN_BILLED_SECONDS = 10.0
+
+
+def is_network_error(error):
+    """True for failures that mean Groq is unreachable rather than the request being bad"""
+    try:
+        import groq
+    except ImportError:
+        return False
+    if isinstance(error, groq.APIConnectionError):  # Includes timeouts
+        return True
+    return isinstance(error, groq.APIStatusError) and error.status_code >= 500
+
+
+def is_rate_limited(error):
+    return getattr(error, "status_code", None) == 429
+
+
+def is_retryable(error):
+    """Failures worth sending the same request again for"""
+    return is_rate_limited(error) or getattr(error, "status_code", None) == 408 or is_network_error(error)
+
+
+def retry_after(error):
+    """Seconds the API asked us to wait, or None"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt, base=GROQ_RETRY_BACKOFF_SECONDS):
+    """Exponential backoff with full jitter for the given (1-based) attempt"""
+    return random.uniform(0, min(base * 2 ** (attempt - 1), MAX_BACKOFF_SECONDS))
+
+
+class TokenBucket:
+    """Refills at ``rate`` tokens per second up to ``capacity``
+
+    ``reserve`` always succeeds and may leave the bucket in debt; the caller
+    sleeps for the returned time. Callers are therefore served in the order
+    they asked, and nothing is ever dropped.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Take ``amount`` tokens; returns the seconds to wait before using them"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    def level(self):
+        """Fraction of capacity currently available, without taking any"""
+        with self.lock:
+            tokens = min(self.capacity, self.tokens + (time.monotonic() - self.updated) * self.rate)
+            return tokens / self.capacity
+
+
+class RequestScheduler:
+    """Run API requests within the local budgets, retrying transient failures"""
+
+    def __init__(self, requests_per_minute=GROQ_REQUESTS_PER_MINUTE,
+                 audio_seconds_per_hour=GROQ_AUDIO_SECONDS_PER_HOUR,
+                 attempts=GROQ_RETRY_ATTEMPTS, backoff=GROQ_RETRY_BACKOFF_SECONDS,
+                 preview_share=GROQ_PREVIEW_BUDGET_SHARE):
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute) if requests_per_minute else None
+        self.audio = TokenBucket(audio_seconds_per_hour / 3600, audio_seconds_per_hour) if audio_seconds_per_hour else None
+        # Optional requests also draw on this, so a long live session can't spend the hour on previews
+        optional = audio_seconds_per_hour * preview_share
+        self.optional = TokenBucket(optional / 3600, optional) if optional > 0 else None
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        # Off when a caller has a quicker way round an outage than waiting (a local model)
+        self.retry_network = True
+        self.lock = threading.Lock()
+        self.resume_at = 0.0
+        self.retries = 0
+        self.throttled = 0
+
+    def pause(self, seconds):
+        """Hold every request back for a while, e.g. after a 429"""
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    def has_spare(self, reserve=0.5):
+        """True when a request could go now and leave ``reserve`` of each budget untouched"""
+        with self.lock:
+            if self.resume_at > time.monotonic():
+                return False
+        buckets = [b for b in (self.requests, self.audio) if b is not None]
+        return all(bucket.level() > reserve for bucket in buckets)
+
+    def try_run(self, request, audio_seconds=0, reserve=0.5):
+        """Run an optional request once, only if the budget has room to spare; None when skipped
+
+        For requests (live previews) that must never delay or crowd out real ones.
+        Besides leaving ``reserve`` of each budget, they are limited to
+        GROQ_PREVIEW_BUDGET_SHARE of the audio budget, billed like any request.
+        """
+        if not self.has_spare(reserve):
+            return None
+        if self.optional is not None:
+            billed = max(audio_seconds, MIN_BILLED_SECONDS)
+            if self.optional.level() * self.optional.capacity < billed:
+                return None
+            self.optional.reserve(billed)
+        self.wait_turn(audio_seconds)
+        return request()
+
+    def wait_turn(self, audio_seconds):
+        """Take one request (and the audio) from the budgets, sleeping until they allow it"""
+        wait = 0.0
+        if self.requests is not None:
+            wait = self.requests.reserve(1)
+        if self.audio is not None and audio_seconds:
+            wait = max(wait, self.audio.reserve(max(audio_seconds, MIN_BILLED_SECONDS)))
+        with self.lock:
+            wait = max(wait, self.resume_at - time.monotonic())
+        if wait > 0:
+            print(f"Rate limit budget: request queued for {wait:.1f}s")
+            time.sleep(wait)
+
+    def run(self, request, audio_seconds=0):
+        """Call ``request()`` once its turn comes; retries transient failures, raises the rest"""
+        for attempt in range(1, self.attempts + 1):
+            # Audio is only counted once; a rejected request wasn't billed again
+            self.wait_turn(audio_seconds if attempt == 1 else 0)
+            try:
+                return request()
+            except Exception as e:
+                if attempt == self.attempts or not is_retryable(e):
+                    raise
+                if not self.retry_network and not is_rate_limited(e) and is_network_error(e):
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    delay = backoff_delay(attempt, self.backoff)
+                with self.lock:
+                    self.retries += 1
+                    self.throttled += is_rate_limited(e)
+                print(f"Request failed ({e}); retry {attempt} of {self.attempts - 1} in {delay:.1f}s")
+                if is_rate_limited(e):
+                    # The limit is shared, so everyone else waits too
+                    self.pause(delay)
+                else:
+                    time.sleep(delay)
+
+    def stats(self):
+        with self.lock:
+            return {"retries": self.retries, "throttled": self.throttled}
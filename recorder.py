@@ -1,31 +1,46 @@
 #!/usr/bin/env python3
+import startup_profile  # First, so --profile-startup can time the imports below
+import argparse
 import os
-import tempfile
-import wave
-import pyaudio
 import time
-from groq import Groq
 from dotenv import load_dotenv
-import subprocess
-import pygame  # Add pygame for MP3 playback
-import threading
+import queue
+import metrics
+from config import env_bool, env_float
+from audio_engine import AudioEngine
+from audio_processing import preprocess_pcm
+from groq_client import create_client, prewarm
+from vad import apply_vad
+from streaming import LiveTranscriber, SpeculativeTranscriber, StreamingTranscriber
+from cues import CuePlayer
+from engines import create_engine
+from output_sinks import create_sink
+from history import append_text_file, open_history
 
 # Load environment variables
 load_dotenv()
 
-# Initialize pygame mixer for MP3 playback
-pygame.mixer.init()
-
-# Set up Groq client
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# The cue player (pygame), the Groq client and the transcription engines are
+# created on first use; importing them dominated cold start of this one-shot process
+cues = None
+client = None
+router = None
+sink = None
+history = None
 
 # Lock file paths
 LOCK_FILE = ".recorder.lock"
 STOP_FILE = ".recorder.stop"
 
-# Sound file paths
-START_SOUND = "sounds/start.mp3"
-COMPLETE_SOUND = "sounds/complete.mp3"
+# Recordings are stopped automatically after this long; long ones are chunked for upload
+MAX_RECORDING_SECONDS = env_float("MAX_RECORDING_SECONDS", 120)
+
+# Upload segments while still recording instead of after the stop signal
+STREAMING_TRANSCRIPTION = env_bool("STREAMING_TRANSCRIPTION")
+# Streaming plus a live preview while speaking; settled text is output as it comes
+LIVE_TRANSCRIPTION = env_bool("LIVE_TRANSCRIPTION")
+# Start transcribing at pauses before the stop signal, in case speech has ended
+SPECULATIVE_TRANSCRIPTION = env_bool("SPECULATIVE_TRANSCRIPTION")
 
 def check_lock():
     """Check if another instance is running"""
@@ -58,8 +73,31 @@ def remove_stop_signal():
     except FileNotFoundError:
         pass
 
+def get_cues():
+    """Decode the cue sounds into memory on first use"""
+    global cues
+    if cues is None:
+        cues = CuePlayer()
+    return cues
+
+def get_client():
+    """Groq client on a pooled keep-alive connection, created on first use"""
+    global client
+    if client is None:
+        with startup_profile.phase("API client"):
+            client = create_client()
+    return client
+
+def get_engine():
+    """Transcription engine router (Groq, local model or both) on first use"""
+    global router
+    if router is None:
+        router = create_engine(get_client)
+    return router
+
 def list_audio_devices():
     """List all available audio input devices"""
+    import pyaudio
     p = pyaudio.PyAudio()
     info = []
     print("\nAvailable Audio Input Devices:")
@@ -75,6 +113,7 @@ def list_audio_devices():
 
 def find_best_microphone():
     """Find the first device with 'Microphone' in the name"""
+    import pyaudio
     p = pyaudio.PyAudio()
     for i in range(p.get_device_count()):
         dev_info = p.get_device_info_by_index(i)
@@ -84,216 +123,241 @@ def find_best_microphone():
     p.terminate()
     return None
 
-def play_sound_blocking(sound_file):
-    """Play an MP3 file and wait for it to finish"""
-    try:
-        # Ensure mixer is initialized and not busy
-        if not pygame.mixer.get_init():
-            pygame.mixer.init()
-        # Stop any currently playing sounds
-        pygame.mixer.music.stop()
-        # Load and play
-        pygame.mixer.music.load(sound_file)
-        pygame.mixer.music.play()
-        # Wait for it to finish
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        # Small pause to ensure sound is fully played
-        time.sleep(0.1)
-    except Exception as e:
-        print(f"Warning: Could not play sound {sound_file}: {e}")
-
-def play_sound_nonblocking(sound_file):
-    """Play an MP3 file in a background thread"""
-    def _play():
-        try:
-            # Ensure mixer is initialized
-            if not pygame.mixer.get_init():
-                pygame.mixer.init()
-            pygame.mixer.music.load(sound_file)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Warning: Could not play sound {sound_file}: {e}")
-    
-    thread = threading.Thread(target=_play)
-    thread.daemon = True  # Thread will exit when main program exits
-    thread.start()
+def report_progress(start_time, last_update):
+    """Print elapsed recording time once per second; returns the second shown"""
+    current_second = int(time.time() - start_time)
+    if current_second > last_update:
+        mins, secs = divmod(current_second, 60)
+        print(f"\rRecording: {mins:02d}:{secs:02d}", end="", flush=True)
+    return current_second
 
-def play_double_start_nonblocking():
-    """Play start sound twice in background"""
-    def _play_double():
-        try:
-            # Ensure mixer is initialized
-            if not pygame.mixer.get_init():
-                pygame.mixer.init()
-            pygame.mixer.music.load(START_SOUND)
-            pygame.mixer.music.play()
-            time.sleep(0.3)  # Small delay between plays
-            # Ensure the second play works
-            pygame.mixer.music.load(START_SOUND)  # Reload to ensure it plays
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Warning: Could not play double start sound: {e}")
-    
-    thread = threading.Thread(target=_play_double)
-    thread.daemon = True
-    thread.start()
+def start_trace():
+    """Trace for this one-shot process's dictation; the trigger was launching it"""
+    trace = metrics.Trace("recorder")
+    trace.mark("trigger", time.perf_counter() - startup_profile.elapsed())
+    return trace
 
-def record_audio(duration=6000, sample_rate=48000, channels=2, chunk=1024, input_device_index=None):
-    """Record audio for a fixed duration or until stop signal"""
-    p = pyaudio.PyAudio()
-    
-    # If no input device specified, try to find a default one
-    if input_device_index is None:
-        for i in range(p.get_device_count()):
-            dev_info = p.get_device_info_by_index(i)
-            if dev_info.get('maxInputChannels') > 0:
-                input_device_index = i
-                break
-    
-    # Get device info
-    try:
-        device_info = p.get_device_info_by_index(input_device_index)
-        print(f"\nUsing: {device_info.get('name')}")
-    except Exception as e:
-        print(f"Error getting device info: {e}")
+def finish_recording(engine, trace):
+    """Mark the end of capture on a trace"""
+    if trace is None:
+        return
+    trace.mark("stop")
+    if engine.first_frame_at is not None:
+        trace.mark("first_frame", engine.first_frame_at)
+    trace.device = engine.device_name()
+
+def record_audio(duration=6000, sample_rate=48000, channels=2, chunk=1024, input_device_index=None, trace=None,
+                 speculate=SPECULATIVE_TRANSCRIPTION):
+    """Record audio for a fixed duration or until stop signal
+
+    Returns the audio, its format and, with ``speculate``, the speculative transcriber fed with it.
+    """
+    # No pre-roll: speech starts after the cue, and audio before it is the cue itself
+    engine = AudioEngine(input_device_index, sample_rate, channels, chunk, preroll_seconds=0).open()
+    player = get_cues()
+    speculation = create_speculation(engine, trace) if speculate else None
     
     print(f"Recording... (Create {STOP_FILE} to stop)")
     
-    # Ensure start sound plays and is heard
-    print("Playing start sound...")
-    play_sound_blocking(START_SOUND)
-    print("Start sound complete, beginning recording...")
+    start_time = time.time()
+    last_update = 0
+    
+    try:
+        # Capture starts under the cue instead of after it; the cue itself is dropped
+        player.play("start")
+        engine.start(on_chunk=speculation.feed if speculation is not None else None,
+                     skip_seconds=player.capture_skip())
+        # One-shot process: open the API connection while the user is still talking
+        prewarm(get_client(), force=True)
+        get_engine().warm()
+        while time.time() - start_time < duration:
+            if check_stop_signal():
+                print("\nStop signal received.")
+                # Play double start sound in background
+                player.play("stop")
+                break
+            last_update = report_progress(start_time, last_update)
+            time.sleep(0.1)
+    finally:
+        print("\nStopping...")
+        audio = engine.stop()
+        finish_recording(engine, trace)
+        sample_rate, channels = engine.sample_rate, engine.channels
+        engine.close()
     
-    stream = p.open(
-        format=pyaudio.paInt16,
-        channels=channels,
-        rate=sample_rate,
-        input=True,
-        frames_per_buffer=chunk,
-        input_device_index=input_device_index
+    # Only process if we got some audio
+    if audio:
+        elapsed = time.time() - start_time
+        mins, secs = divmod(int(elapsed), 60)
+        print(f"Recorded {mins:02d}:{secs:02d}")
+        if trace is not None:
+            trace.audio_seconds = len(audio) / (sample_rate * channels * 2)
+        return audio, sample_rate, channels, speculation
+    return None, None, None, None
+
+def create_speculation(engine, trace=None):
+    """Speculative transcriber for the engine's next recording
+
+    Pauses only send requests while the rate budget has room to spare.
+    """
+    sample_rate, channels = engine.sample_rate, engine.channels
+    return SpeculativeTranscriber(
+        lambda audio: transcribe_pcm(audio, sample_rate, channels),
+        engine.snapshot,
+        sample_rate,
+        channels,
+        allowed=lambda: get_engine().remote.scheduler.has_spare(),
+        trace=trace,
     )
+
+def transcribe_recording(audio, sample_rate, channels, speculation=None):
+    """Transcribe a finished recording, reusing a speculative transcription that covers it"""
+    transcription = speculation.finish() if speculation is not None else None
+    return transcription or transcribe_pcm(audio, sample_rate, channels)
+
+def create_streaming_transcriber(sample_rate, channels, live=LIVE_TRANSCRIPTION, trace=None):
+    """Segment uploader for streaming mode; in live mode it also previews and outputs as it goes"""
+    def transcribe_segment(segment):
+        return transcribe_pcm(segment, sample_rate, channels)
+
+    if not live:
+        return StreamingTranscriber(transcribe_segment, sample_rate, channels, trace=trace)
+    return LiveTranscriber(
+        transcribe_segment,
+        lambda tail: transcribe_preview(tail, sample_rate, channels),
+        sample_rate,
+        channels,
+        on_commit=get_sink().write,
+        trace=trace,
+    )
+
+def record_and_transcribe_streaming(duration=6000, sample_rate=48000, channels=2, chunk=1024, input_device_index=None,
+                                    live=LIVE_TRANSCRIPTION, trace=None):
+    """Record until stop signal while uploading segments as they close"""
+    engine = AudioEngine(input_device_index, sample_rate, channels, chunk, preroll_seconds=0).open()
+    player = get_cues()
     
-    frames = []
+    print(f"Recording in streaming mode... (Create {STOP_FILE} to stop)")
+    
+    sample_rate, channels = engine.sample_rate, engine.channels
+    transcriber = create_streaming_transcriber(sample_rate, channels, live, trace)
+    # PortAudio's callback thread is the producer; this loop segments and uploads
+    chunks = queue.Queue()
     
-    # Calculate total chunks needed for the duration
-    total_chunks = int((sample_rate * duration) / chunk)
     start_time = time.time()
     last_update = 0
-    last_check = 0
+    captured = 0
     
     try:
-        for _ in range(total_chunks):
-            current_time = time.time()
-            
-            # Check for stop signal every second
-            if current_time - last_check >= 1:
-                if check_stop_signal():
-                    print("\nStop signal received.")
-                    # Play double start sound in background
-                    play_double_start_nonblocking()
-                    break
-                last_check = current_time
-                
+        player.play("start")
+        engine.start(on_chunk=chunks.put, skip_seconds=player.capture_skip())
+        prewarm(get_client(), force=True)
+        get_engine().warm()
+        while time.time() - start_time < duration:
+            if check_stop_signal():
+                print("\nStop signal received.")
+                player.play("stop")
+                break
             try:
-                data = stream.read(chunk, exception_on_overflow=False)
-                frames.append(data)
-            except OSError as e:
-                print(f"Warning: {str(e)}")
+                data = chunks.get(timeout=0.1)
+            except queue.Empty:
                 continue
-            
-            # Update progress every second
-            elapsed = current_time - start_time
-            current_second = int(elapsed)
-            if current_second > last_update:
-                mins, secs = divmod(current_second, 60)
-                print(f"\rRecording: {mins:02d}:{secs:02d}", end="", flush=True)
-                last_update = current_second
-                
+            transcriber.feed(data)
+            captured += len(data)
+            if not live:  # The live preview owns the terminal line
+                last_update = report_progress(start_time, last_update)
     finally:
         print("\nStopping...")
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
+        engine.stop()
+        finish_recording(engine, trace)
+        engine.close()
     
-    # Only process if we got some audio
-    if frames:
-        elapsed = time.time() - start_time
-        mins, secs = divmod(int(elapsed), 60)
-        print(f"Recorded {mins:02d}:{secs:02d}")
-        return frames, sample_rate
-    return None, None
-
-def save_audio(frames, sample_rate):
-    """Save recorded audio to a temporary WAV file"""
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_audio:
-        wf = wave.open(temp_audio.name, "wb")
-        wf.setnchannels(2)  # Stereo
-        wf.setsampwidth(pyaudio.PyAudio().get_sample_size(pyaudio.paInt16))
-        wf.setframerate(sample_rate)
-        wf.writeframes(b"".join(frames))
-        wf.close()
-        return temp_audio.name
-
-def transcribe_audio(audio_file_path):
-    """Transcribe audio using Groq's Whisper implementation"""
-    try:
-        print("Transcribing...")
-        with open(audio_file_path, "rb") as file:
-            transcription = client.audio.transcriptions.create(
-                file=(os.path.basename(audio_file_path), file.read()),
-                model="whisper-large-v3-turbo",
-                prompt="""Australian software developer using British/Australian spelling (colour, optimise, centre).
-                Context: Python programming, technical discussions.
-                Expected content:
-                - Programming terms (Python, Git, Docker)
-                - Code syntax and commands
-                - File paths (/home/user/, .py, .env)
-                - Technical jargon and package names
-                Please transcribe symbols exactly ('underscore' for _, 'dot' for .) and maintain proper capitalisation of technical terms.""",
-                response_format="text",
-                language="en",
-            )
-            # Strip any leading/trailing whitespace from the transcription
-            return transcription.strip() if transcription else None
-    except Exception as e:
-        print(f"Transcription error: {str(e)}")
+    # Feed whatever was captured between the stop signal and the stream stopping
+    while True:
+        try:
+            data = chunks.get_nowait()
+        except queue.Empty:
+            break
+        transcriber.feed(data)
+        captured += len(data)
+    
+    if not captured:
         return None
+    if trace is not None:
+        trace.audio_seconds = captured / (sample_rate * channels * 2)
+    return transcriber.finish()
 
-def type_text_at_cursor(text):
-    """Type text at current cursor position using xdotool"""
-    if not text:
-        return
-        
-    try:
-        # Use xdotool to type the text
-        # We use --clearmodifiers to ensure no stuck modifier keys
-        subprocess.run([
-            'xdotool', 'type', '--clearmodifiers', '--delay', '1',
-            text
-        ], check=True)
-        
-        print("Text has been typed at cursor position.")
-    except subprocess.CalledProcessError as e:
-        print(f"Error typing text: {e}")
-    except Exception as e:
-        print(f"Unexpected error while typing text: {e}")
-
-def append_transcription(text):
-    """Handle transcribed text"""
+def transcribe_preview(data, sample_rate, channels=2):
+    """Quick, uncached transcription of audio still being recorded, or None"""
+    data, sample_rate, channels = preprocess_pcm(data, sample_rate, channels)
+    return get_engine().transcribe_partial(data, sample_rate, channels)
+
+def transcribe_pcm(data, sample_rate, channels=2):
+    """Transcribe a block of raw PCM without writing it to disk"""
+    data, sample_rate, channels = preprocess_pcm(data, sample_rate, channels)
+    data = apply_vad(data, sample_rate, channels)
+    if data is None:
+        return None
+    return get_engine().transcribe(data, sample_rate, channels)
+
+def get_sink():
+    """Output sink chosen by OUTPUT_SINK (paste, type or print), created on first use"""
+    global sink
+    if sink is None:
+        sink = create_sink()
+    return sink
+
+def get_history():
+    """Transcript history store (None if disabled), opened on first use"""
+    global history
+    if history is None:
+        history = open_history() or False
+    return history or None
+
+def append_transcription(text, write_output=True):
+    """Handle transcribed text; without write_output it was already output live"""
     if text:
-        # First type at cursor
-        type_text_at_cursor(text)
-        
-        # Then append to log file (optional)
-        output_file = os.path.expanduser("~/transcriptions.txt")
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        with open(output_file, "a") as f:
-            f.write(f"\n[{timestamp}]\n{text}\n")
-            f.write("-" * 80 + "\n")
+        # First put it at the cursor
+        if write_output:
+            get_sink().write(text)
+        metrics.mark("delivered")
         
         # Play completion sound in background
-        play_sound_nonblocking(COMPLETE_SOUND)
+        get_cues().play("complete")
+        
+        # Then record it; the store commits on its own thread
+        store = get_history()
+        if store is not None:
+            store.add(text, metrics.current())
+        append_text_file(text)
+
+def select_input_device():
+    """Configured AUDIO_DEVICE_INDEX, else the first microphone found, else None"""
+    # Try to get configured device
+    AUDIO_DEVICE_INDEX = os.getenv("AUDIO_DEVICE_INDEX")
+    selected_device = None
+    
+    if AUDIO_DEVICE_INDEX is not None:
+        # Strip any comments and whitespace
+        AUDIO_DEVICE_INDEX = AUDIO_DEVICE_INDEX.split('#')[0].strip()
+        try:
+            selected_device = int(AUDIO_DEVICE_INDEX)
+        except ValueError:
+            print(f"Warning: Invalid AUDIO_DEVICE_INDEX value '{AUDIO_DEVICE_INDEX}'")
+    
+    # If no valid config, try to find a microphone
+    if selected_device is None:
+        print("No valid device configured in .env")
+        print("\nAvailable devices:")
+        list_audio_devices()
+        
+        selected_device = find_best_microphone()
+        if selected_device is not None:
+            print(f"\nTip: Found a microphone at index {selected_device}")
+            print("Add AUDIO_DEVICE_INDEX={selected_device} to .env to skip device listing")
+        else:
+            print("\nTip: Add AUDIO_DEVICE_INDEX=<number> to .env to select a device")
+    return selected_device
 
 def main():
     # Check if another instance is running
@@ -307,59 +371,72 @@ def main():
         # Remove any stale stop signal
         remove_stop_signal()
         
-        # Try to get configured device
-        AUDIO_DEVICE_INDEX = os.getenv("AUDIO_DEVICE_INDEX")
-        selected_device = None
-        
-        if AUDIO_DEVICE_INDEX is not None:
-            # Strip any comments and whitespace
-            AUDIO_DEVICE_INDEX = AUDIO_DEVICE_INDEX.split('#')[0].strip()
-            try:
-                selected_device = int(AUDIO_DEVICE_INDEX)
-            except ValueError:
-                print(f"Warning: Invalid AUDIO_DEVICE_INDEX value '{AUDIO_DEVICE_INDEX}'")
-        
-        # If no valid config, try to find a microphone
+        selected_device = select_input_device()
         if selected_device is None:
-            print("No valid device configured in .env")
-            print("\nAvailable devices:")
-            list_audio_devices()
-            
-            selected_device = find_best_microphone()
-            if selected_device is not None:
-                print(f"\nTip: Found a microphone at index {selected_device}")
-                print("Add AUDIO_DEVICE_INDEX={selected_device} to .env to skip device listing")
+            return
+        
+        trace = start_trace()
+        if STREAMING_TRANSCRIPTION or LIVE_TRANSCRIPTION:
+            # Segments are uploaded while we record; only the last one is left on stop
+            transcription = record_and_transcribe_streaming(duration=MAX_RECORDING_SECONDS, input_device_index=selected_device,
+                                                            trace=trace)
+            if transcription:
+                with trace.active():
+                    append_transcription(transcription, write_output=not LIVE_TRANSCRIPTION)
             else:
-                print("\nTip: Add AUDIO_DEVICE_INDEX=<number> to .env to select a device")
-                return
+                print("No audio transcribed.")
+            trace.finish(delivered=bool(transcription))
+            return
         
         # Record audio
-        frames, sample_rate = record_audio(duration=120, input_device_index=selected_device)
+        audio, sample_rate, channels, speculation = record_audio(duration=MAX_RECORDING_SECONDS,
+                                                                 input_device_index=selected_device, trace=trace)
         
-        if frames:
-            # Save to temporary file
-            temp_audio_file = save_audio(frames, sample_rate)
-            
-            try:
-                # Transcribe
-                transcription = transcribe_audio(temp_audio_file)
+        if audio:
+            # Downmix/resample, save, transcribe and clean up the temp file
+            with trace.active():
+                transcription = transcribe_recording(audio, sample_rate, channels, speculation)
                 
                 # Append to file
                 append_transcription(transcription)
-                
-            finally:
-                # Clean up temp file
-                try:
-                    os.unlink(temp_audio_file)
-                except Exception as e:
-                    print(f"Warning: Could not delete temporary file: {e}")
         else:
             print("No audio recorded.")
+        trace.finish(delivered=bool(audio and transcription))
             
     finally:
         # Always clean up lock file
         remove_lock()
         remove_stop_signal()
+        # Don't cut off the completion cue or a clipboard restore when this one-shot process exits
+        if sink is not None:
+            sink.close()
+        if history:
+            history.close()
+        if cues is not None:
+            cues.wait()
+
+def profile_startup(as_json=False, import_only=False):
+    """Walk the startup path up to the first captured frame and report timings"""
+    get_client()
+    if not import_only:
+        get_cues()
+        selected_device = select_input_device()
+        if selected_device is not None:
+            # No pre-roll, so the stream only starts when asked and first-frame time is real
+            engine = AudioEngine(selected_device, preroll_seconds=0).open()
+            startup_profile.measure_first_frame(engine)
+            engine.close()
+    startup_profile.report(as_json)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Record, transcribe and type one dictation")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report import and startup phase timings instead of recording")
+    parser.add_argument("--json", action="store_true", help="Print the startup profile as JSON")
+    parser.add_argument("--import-only", action="store_true",
+                        help="Profile imports and client setup only, without audio hardware")
+    args = parser.parse_args()
+    if args.profile_startup:
+        profile_startup(args.json, args.import_only)
+    else:
+        main()
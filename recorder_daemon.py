@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""Resident recorder: keeps audio, sounds and the API client warm between dictations
+
+Control it over a Unix domain socket with recorderctl.py (start, stop,
+toggle, status, quit) instead of launching recorder.py for every dictation.
+"""
+import json
+import os
+import signal
+import socket
+import threading
+import time
+
+import metrics
+from config import env_str
+from audio_engine import AudioEngine
+from streaming import LiveTranscriber
+import recorder
+
+# Control socket; relative paths are inside the repository like the lock files
+SOCKET_PATH = env_str("RECORDER_SOCKET", ".recorder.sock")
+
+
+class RecorderDaemon:
+    """Owns one warm AudioEngine and serves start/stop/status requests"""
+
+    def __init__(self, input_device_index=None):
+        # No pre-roll, as in recorder.py: speech starts after the cue, which is skipped anyway
+        self.engine = AudioEngine(input_device_index, preroll_seconds=0).open()
+        # Load everything the one-shot recorder defers, and keep it loaded
+        self.cues = recorder.get_cues()
+        recorder.prewarm(recorder.get_client(), force=True)
+        recorder.get_engine().warm()
+        self.lock = threading.Lock()
+        self.state = "idle"
+        self.started_at = None
+        self.streaming = None
+        self.speculation = None
+        self.trace = None
+        self.timer = None
+        self.running = True
+        self.transcribing = 0
+
+    def status(self):
+        cache = recorder.get_engine().cache
+        hedger = recorder.get_engine().remote.hedger
+        with self.lock:
+            elapsed = time.time() - self.started_at if self.state == "recording" else 0
+            return {
+                "state": self.state,
+                "elapsed": round(elapsed, 2),
+                "transcribing": self.transcribing,
+                "pid": os.getpid(),
+                "cache": cache.stats() if cache is not None else None,
+                "metrics": metrics.summary(),
+                "hedging": hedger.stats() if hedger is not None else None,
+            }
+
+    def start(self):
+        """Begin capturing immediately; the stream is already open"""
+        with self.lock:
+            if self.state == "recording":
+                return {"ok": False, "error": "already recording"}
+            self.trace = metrics.Trace("daemon")
+            self.trace.mark("trigger")
+            sample_rate, channels = self.engine.sample_rate, self.engine.channels
+            on_chunk = None
+            if recorder.STREAMING_TRANSCRIPTION or recorder.LIVE_TRANSCRIPTION:
+                self.streaming = recorder.create_streaming_transcriber(sample_rate, channels, trace=self.trace)
+                on_chunk = self.streaming.feed
+            elif recorder.SPECULATIVE_TRANSCRIPTION:
+                self.speculation = recorder.create_speculation(self.engine, self.trace)
+                on_chunk = self.speculation.feed
+            # The cue plays from memory as capture starts and is skipped in the recording
+            self.cues.play("start")
+            self.engine.start(on_chunk=on_chunk, skip_seconds=self.cues.capture_skip())
+            self.state = "recording"
+            self.started_at = time.time()
+            self.timer = threading.Timer(recorder.MAX_RECORDING_SECONDS, self.stop)
+            self.timer.daemon = True
+            self.timer.start()
+        recorder.prewarm(recorder.get_client())
+        print("\nRecording...")
+        return {"ok": True}
+
+    def stop(self):
+        """Stop capturing and transcribe in the background so the caller returns at once"""
+        with self.lock:
+            if self.state != "recording":
+                return {"ok": False, "error": "not recording"}
+            self.timer.cancel()
+            audio = self.engine.stop()
+            trace, self.trace = self.trace, None
+            recorder.finish_recording(self.engine, trace)
+            trace.audio_seconds = len(audio) / (self.engine.sample_rate * self.engine.channels * 2)
+            streaming, self.streaming = self.streaming, None
+            speculation, self.speculation = self.speculation, None
+            elapsed = time.time() - self.started_at
+            self.state = "idle"
+            self.transcribing += 1
+        self.cues.play("stop")
+        mins, secs = divmod(int(elapsed), 60)
+        print(f"Recorded {mins:02d}:{secs:02d}")
+
+        worker = threading.Thread(
+            target=self._transcribe,
+            args=(audio, self.engine.sample_rate, self.engine.channels, streaming, speculation, trace),
+        )
+        worker.daemon = True
+        worker.start()
+        return {"ok": True, "seconds": round(elapsed, 2)}
+
+    def _transcribe(self, audio, sample_rate, channels, streaming, speculation, trace):
+        transcription = None
+        try:
+            with trace.active():
+                if streaming is not None:
+                    transcription = streaming.finish()
+                else:
+                    transcription = recorder.transcribe_recording(audio, sample_rate, channels, speculation) if audio else None
+                if transcription:
+                    # Live mode has already output the text segment by segment
+                    live = isinstance(streaming, LiveTranscriber)
+                    recorder.append_transcription(transcription, write_output=not live)
+                else:
+                    print("No audio transcribed.")
+        except Exception as e:
+            print(f"Error processing recording: {e}")
+        finally:
+            trace.finish(delivered=bool(transcription))
+            with self.lock:
+                self.transcribing -= 1
+
+    def toggle(self):
+        with self.lock:
+            recording = self.state == "recording"
+        return self.stop() if recording else self.start()
+
+    def quit(self):
+        self.running = False
+        return {"ok": True}
+
+    def handle(self, command):
+        handlers = {
+            "start": self.start,
+            "stop": self.stop,
+            "toggle": self.toggle,
+            "status": lambda: dict(self.status(), ok=True),
+            "quit": self.quit,
+        }
+        handler = handlers.get(command)
+        if handler is None:
+            return {"ok": False, "error": f"unknown command '{command}'"}
+        return handler()
+
+    def close(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+        self.engine.close()
+        if recorder.history:
+            recorder.history.close()
+
+
+def _claim_socket(path):
+    """Bind the control socket, replacing a stale one left by a crashed daemon"""
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(path)
+        else:
+            probe.close()
+            raise RuntimeError(f"A recorder daemon is already listening on {path}")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen(4)
+    return server
+
+
+def serve(daemon, path=SOCKET_PATH):
+    """Answer one newline-terminated command per connection with a JSON line"""
+    server = _claim_socket(path)
+    server.settimeout(0.5)  # Wake up regularly to notice quit
+    print(f"Recorder daemon listening on {path}")
+    try:
+        while daemon.running:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            with conn:
+                try:
+                    command = conn.makefile("r").readline().strip().lower()
+                    reply = daemon.handle(command)
+                except Exception as e:
+                    reply = {"ok": False, "error": str(e)}
+                conn.sendall((json.dumps(reply) + "\n").encode())
+    finally:
+        server.close()
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    selected_device = recorder.select_input_device()
+    if selected_device is None:
+        return
+    daemon = RecorderDaemon(selected_device)
+    # Shut down like quit on kill, so the socket is removed and the scripts don't find it
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.quit())
+    try:
+        serve(daemon)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Tiny client for the recorder daemon: recorderctl.py start|stop|toggle|status|quit"""
+import json
+import os
+import socket
+import sys
+
+# Kept free of heavy imports so each hotkey press costs only interpreter start-up
+SOCKET_PATH = os.getenv("RECORDER_SOCKET", ".recorder.sock").split('#')[0].strip()
+COMMANDS = ("start", "stop", "toggle", "status", "quit")
+# Exit status when no daemon answers, so run_recorder.sh can fall back to recorder.py
+NOT_RUNNING = 3
+
+
+def send_command(command, path=SOCKET_PATH, timeout=5.0):
+    """Send one command and return the daemon's decoded reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(path)
+        conn.sendall((command + "\n").encode())
+        return json.loads(conn.makefile("r").readline())
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in COMMANDS:
+        print(f"Usage: {os.path.basename(sys.argv[0])} {'|'.join(COMMANDS)}")
+        return 2
+    try:
+        reply = send_command(sys.argv[1])
+    except FileNotFoundError:
+        print(f"Recorder daemon is not running (no socket at {SOCKET_PATH})")
+        return NOT_RUNNING
+    except ConnectionRefusedError:
+        # A daemon that was killed or crashed leaves its socket file behind
+        print(f"Recorder daemon is not running (stale socket at {SOCKET_PATH})")
+        return NOT_RUNNING
+    except socket.timeout:
+        print("Recorder daemon did not answer in time")
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Recorder daemon gave no usable reply: {e}")
+        return 1
+    print(json.dumps(reply))
+    return 0 if reply.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,16 @@
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 cd "$SCRIPT_DIR"
 
+# If the resident daemon is running, just tell it to start recording
+if [ -S .recorder.sock ]; then
+    python3 recorderctl.py start
+    status=$?
+    # 3 means nothing answered: the socket was left behind by a killed daemon
+    if [ $status -ne 3 ]; then
+        exit $status
+    fi
+fi
+
 # Function to clean up on exit
 cleanup() {
     echo -e "\nStopping recorder..."
@@ -53,15 +53,9 @@ if ! groups | grep -q "audio"; then
     exit 1
 fi
 
-# Create sounds directory if it doesn't exist
-mkdir -p sounds
-
-# Create sound files if they don't exist (you'll need to provide the actual sound files)
-if [ ! -f sounds/start.wav ] || [ ! -f sounds/complete.wav ]; then
-    echo "[$(date '+%Y-%m-%d %H:%M:%S')] Please ensure sound files exist in the sounds directory:"
-    echo "- sounds/start.wav"
-    echo "- sounds/complete.wav"
-fi
+# Render the cue sounds into the cache now rather than on first use
+echo "[$(date '+%Y-%m-%d %H:%M:%S')] Generating cue sounds..."
+python3 generate_sounds.py
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] Installation complete!"
 echo "You can now use run_recorder.sh to start/stop recording." 
\ No newline at end of file
@@ -0,0 +1,14 @@
+#!/bin/bash
+
+# Start the resident recorder daemon; control it with recorderctl.py
+
+# Get the absolute path to the script directory
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+cd "$SCRIPT_DIR"
+
+# Activate virtual environment
+source venv/bin/activate
+
+# Run the daemon with ALSA errors redirected to /dev/null
+exec 2> >(grep -v -E "ALSA lib|Invalid card" >&2)
+exec python recorder_daemon.py
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Cold-start timing for the entry points (--profile-startup)
+
+Import this module before anything heavy: when --profile-startup is on the
+command line it times every first-time import from then on, and ``phase``
+records named startup steps (PortAudio init, device probe, sound load...).
+"""
+import builtins
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+_T0 = time.perf_counter()
+
+ENABLED = "--profile-startup" in sys.argv
+
+# Nested imports deeper than this are folded into their parent's time
+MAX_IMPORT_DEPTH = 2
+
+_imports = []
+_phases = []
+_depth = 0
+_original_import = builtins.__import__
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """builtins.__import__ wrapper that records first-time absolute imports"""
+    global _depth
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    entry = [_depth, name, None]
+    if _depth < MAX_IMPORT_DEPTH:
+        _imports.append(entry)
+    _depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        entry[2] = time.perf_counter() - start
+        _depth -= 1
+
+
+if ENABLED:
+    builtins.__import__ = _timed_import
+
+
+@contextmanager
+def phase(name):
+    """Time a named startup step (no-op unless profiling)"""
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - start))
+
+
+def record(name, seconds):
+    """Record a step timed elsewhere, e.g. from a callback thread"""
+    if ENABLED:
+        _phases.append((name, seconds))
+
+
+def measure_first_frame(engine, timeout=2.0):
+    """Start an opened AudioEngine (without pre-roll) and time the first captured chunk"""
+    first_frame = threading.Event()
+    start = time.perf_counter()
+    engine.start(on_chunk=lambda data: first_frame.set())
+    if first_frame.wait(timeout):
+        record("first captured frame", time.perf_counter() - start)
+    else:
+        print(f"Warning: No audio captured within {timeout:.0f} seconds")
+    engine.stop()
+
+
+def elapsed():
+    """Seconds since this module was imported"""
+    return time.perf_counter() - _T0
+
+
+def results():
+    """Collected timings as a plain dict"""
+    return {
+        "total_ms": round(elapsed() * 1000, 1),
+        "imports": [
+            {"module": name, "depth": depth, "ms": round((seconds or 0) * 1000, 1)}
+            for depth, name, seconds in _imports
+        ],
+        "phases": [{"phase": name, "ms": round(seconds * 1000, 1)} for name, seconds in _phases],
+    }
+
+
+def report(as_json=False, min_ms=1.0):
+    """Print the startup profile"""
+    data = results()
+    if as_json:
+        print(json.dumps(data))
+        return data
+
+    print("\nImports (first time, cumulative):")
+    print("-" * 60)
+    for entry in data["imports"]:
+        if entry["ms"] >= min_ms:
+            indent = "  " * entry["depth"]
+            print(f"{indent + entry['module']:<45}{entry['ms']:>10.1f} ms")
+    print("\nPhases:")
+    print("-" * 60)
+    for entry in data["phases"]:
+        print(f"{entry['phase']:<45}{entry['ms']:>10.1f} ms")
+    print("-" * 60)
+    print(f"{'Total since start':<45}{data['total_ms']:>10.1f} ms")
+    return data
@@ -4,6 +4,15 @@
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 cd "$SCRIPT_DIR"
 
+# If the resident daemon is running, stop it over its socket (no polling)
+if [ -S .recorder.sock ]; then
+    python3 recorderctl.py stop
+    status=$?
+    # 3 means nothing answered: the socket was left behind by a killed daemon
+    if [ $status -ne 3 ]; then
+        exit $status
+    fi
+fi
 
 # Create the stop file to signal the recorder to stop
 touch .recorder.stop
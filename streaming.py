@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import metrics
+from config import env_float, env_int
+
+# Segmentation defaults (seconds), overridable from .env
+SEGMENT_MIN_SECONDS = env_float("STREAM_SEGMENT_MIN_SECONDS", 8.0)
+SEGMENT_MAX_SECONDS = env_float("STREAM_SEGMENT_MAX_SECONDS", 20.0)
+SEGMENT_OVERLAP_SECONDS = env_float("STREAM_SEGMENT_OVERLAP_SECONDS", 1.0)
+SILENCE_SECONDS = env_float("STREAM_SILENCE_SECONDS", 0.4)
+SILENCE_RMS = env_float("STREAM_SILENCE_RMS", 500.0)
+STREAM_WORKERS = env_int("STREAM_WORKERS", 2)
+
+# Live mode: how often the unfinished segment is re-transcribed for a preview
+LIVE_INTERVAL_SECONDS = env_float("LIVE_INTERVAL_SECONDS", 1.5)
+# Previews of less audio than this are not worth a request
+LIVE_MIN_SECONDS = 1.0
+
+# Speculative mode: a pause this long after speech sends the recording so far
+SPECULATIVE_SILENCE_SECONDS = env_float("SPECULATIVE_SILENCE_SECONDS", 0.6)
+# Recordings shorter than this are not worth a speculative request
+SPECULATIVE_MIN_SECONDS = 0.5
+
+# Longest run of words we will try to match when removing overlap duplicates
+MAX_OVERLAP_WORDS = 12
+
+
+def chunk_rms(data):
+    """Root-mean-square level of a chunk of 16-bit PCM"""
+    samples = np.frombuffer(data, dtype=np.int16)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float32) ** 2)))
+
+
+def _normalise_word(word):
+    """Lower-case a word and drop punctuation so overlaps compare cleanly"""
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def stitch_transcripts(previous, current, max_overlap=MAX_OVERLAP_WORDS):
+    """Join two partial transcripts, dropping words repeated across the overlap"""
+    if not previous:
+        return current or ""
+    if not current:
+        return previous
+
+    prev_words = previous.split()
+    curr_words = current.split()
+    prev_norm = [_normalise_word(w) for w in prev_words[-max_overlap:]]
+    curr_norm = [_normalise_word(w) for w in curr_words[:max_overlap]]
+
+    # Longest suffix of the previous text that is a prefix of the current text
+    overlap = 0
+    for size in range(min(len(prev_norm), len(curr_norm)), 0, -1):
+        if prev_norm[-size:] == curr_norm[:size]:
+            overlap = size
+            break
+
+    remainder = curr_words[overlap:]
+    if not remainder:
+        return previous
+    return previous + " " + " ".join(remainder)
+
+
+class Segmenter:
+    """Cut a stream of PCM chunks into overlapping segments at silence boundaries"""
+
+    def __init__(self, sample_rate, channels, sample_width=2,
+                 min_seconds=SEGMENT_MIN_SECONDS, max_seconds=SEGMENT_MAX_SECONDS,
+                 overlap_seconds=SEGMENT_OVERLAP_SECONDS,
+                 silence_seconds=SILENCE_SECONDS, silence_rms=SILENCE_RMS):
+        bytes_per_second = sample_rate * channels * sample_width
+        self.frame_bytes = channels * sample_width
+        self.min_bytes = int(min_seconds * bytes_per_second)
+        self.max_bytes = int(max_seconds * bytes_per_second)
+        self.overlap_bytes = int(overlap_seconds * bytes_per_second)
+        self.silence_bytes = int(silence_seconds * bytes_per_second)
+        self.silence_rms = silence_rms
+        self.buffer = bytearray()
+        self.silent_run = 0
+        self.has_new_audio = False
+
+    def _align(self, size):
+        """Round a byte count down to a whole number of frames"""
+        return size - (size % self.frame_bytes)
+
+    def _cut(self):
+        """Close the current segment and keep its tail as the next overlap"""
+        segment = bytes(self.buffer)
+        tail = self._align(min(self.overlap_bytes, len(self.buffer)))
+        self.buffer = bytearray(self.buffer[len(self.buffer) - tail:]) if tail else bytearray()
+        self.silent_run = 0
+        self.has_new_audio = False
+        return segment
+
+    def feed(self, data):
+        """Add a chunk; returns a finished segment or None"""
+        self.buffer.extend(data)
+        self.has_new_audio = True
+        if chunk_rms(data) < self.silence_rms:
+            self.silent_run += len(data)
+        else:
+            self.silent_run = 0
+
+        if len(self.buffer) >= self.max_bytes:
+            return self._cut()
+        if len(self.buffer) >= self.min_bytes and self.silent_run >= self.silence_bytes:
+            return self._cut()
+        return None
+
+    def flush(self):
+        """Return whatever audio is left once capture stops"""
+        if not self.has_new_audio or not self.buffer:
+            return None
+        return self._cut()
+
+
+class StreamingTranscriber:
+    """Transcribe segments in the background while capture is still running
+
+    ``transcribe_segment`` is called with the raw PCM bytes of one segment
+    and must return its text (or None on failure). Segment requests are
+    counted towards ``trace``, if given.
+    """
+
+    def __init__(self, transcribe_segment, sample_rate, channels, sample_width=2,
+                 workers=STREAM_WORKERS, trace=None, **segmenter_options):
+        self.transcribe_segment = transcribe_segment
+        self.trace = trace
+        self.segmenter = Segmenter(sample_rate, channels, sample_width, **segmenter_options)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        self.futures = []
+
+    def _submit(self, segment):
+        index = len(self.futures)
+        print(f"\nSegment {index + 1} closed, uploading...")
+        self.futures.append(self.executor.submit(metrics.wrap(self.transcribe_segment, self.trace), segment))
+
+    def feed(self, data):
+        """Feed one captured chunk"""
+        segment = self.segmenter.feed(data)
+        if segment:
+            self._submit(segment)
+
+    def finish(self):
+        """Flush the last segment, wait for all uploads and stitch the result"""
+        segment = self.segmenter.flush()
+        if segment:
+            self._submit(segment)
+
+        text = ""
+        try:
+            for future in self.futures:
+                try:
+                    part = future.result()
+                except Exception as e:
+                    print(f"Segment transcription error: {e}")
+                    part = None
+                if part:
+                    text = stitch_transcripts(text, part.strip())
+        finally:
+            self.executor.shutdown(wait=False)
+        return text or None
+
+
+def print_partial(committed, partial):
+    """Show committed text plus the current preview on one rewritten terminal line"""
+    # The preview starts inside the overlap with the last committed segment
+    text = stitch_transcripts(committed, partial)
+    width = shutil.get_terminal_size().columns - 1
+    if len(text) > width:
+        text = "..." + text[-(width - 3):]
+    print(f"\r\x1b[K{text}", end="", flush=True)
+
+
+class LiveTranscriber(StreamingTranscriber):
+    """StreamingTranscriber that also shows what is being said before segments close
+
+    Closed segments are committed in recording order as their uploads
+    finish; ``on_commit`` is called with each newly committed piece of text
+    (ready to be typed or pasted, as it will not change). Only the audio since
+    the last cut can still change, so every ``interval`` seconds just that
+    region is re-transcribed with ``transcribe_partial`` and shown through
+    ``on_partial(committed, preview)``. On stop, only that region is left.
+    """
+
+    def __init__(self, transcribe_segment, transcribe_partial, sample_rate, channels, sample_width=2,
+                 on_partial=print_partial, on_commit=None, interval=LIVE_INTERVAL_SECONDS, **options):
+        super().__init__(transcribe_segment, sample_rate, channels, sample_width, **options)
+        self.transcribe_partial = transcribe_partial
+        self.on_partial = on_partial
+        self.on_commit = on_commit
+        self.interval = interval
+        self.min_bytes = int(LIVE_MIN_SECONDS * sample_rate) * channels * sample_width
+        self.commit_lock = threading.Lock()
+        self.committed = ""
+        self.next_commit = 0
+        self.stopped = threading.Event()
+        self.previewer = threading.Thread(target=self._preview_loop, name="live-preview")
+        self.previewer.daemon = True
+        self.previewer.start()
+
+    def _submit(self, segment):
+        super()._submit(segment)
+        self.futures[-1].add_done_callback(lambda future: self._commit_finished())
+
+    def _commit_finished(self):
+        """Commit every finished segment that has no unfinished one before it"""
+        with self.commit_lock:
+            while self.next_commit < len(self.futures) and self.futures[self.next_commit].done():
+                try:
+                    part = self.futures[self.next_commit].result()
+                except Exception:
+                    part = None  # Reported again by finish()
+                self.next_commit += 1
+                if not part:
+                    continue
+                text = stitch_transcripts(self.committed, part.strip())
+                added = text[len(self.committed):].strip()
+                self.committed = text
+                if added and self.on_commit is not None:
+                    self.on_commit(added if len(text) == len(added) else " " + added)
+            if self.on_partial is not None:
+                self.on_partial(self.committed, "")
+
+    def _preview_loop(self):
+        previewed = 0
+        while not self.stopped.wait(self.interval):
+            # The segmenter replaces its buffer on every cut, so this copy is consistent
+            tail = bytes(self.segmenter.buffer)
+            if len(tail) < self.min_bytes or len(tail) == previewed:
+                continue
+            previewed = len(tail)
+            preview = self.transcribe_partial(tail)
+            if preview and not self.stopped.is_set() and self.on_partial is not None:
+                with self.commit_lock:
+                    self.on_partial(self.committed, preview.strip())
+
+    def finish(self):
+        """Stop previews, then flush and wait as StreamingTranscriber does"""
+        self.stopped.set()
+        text = super().finish()
+        self._commit_finished()
+        if self.on_partial is not None:
+            print()
+        return text
+
+
+class SpeculativeTranscriber:
+    """Start transcribing at each pause in case it turns out to be the end
+
+    People usually stop talking a moment before they release the key or send
+    the stop signal. When ``feed`` sees ``silence_seconds`` of quiet after
+    speech, the recording so far is handed to ``transcribe`` in the
+    background, if ``allowed()`` (e.g. the rate budget) permits. On stop,
+    ``finish`` returns that text when nothing but silence followed it, so
+    the answer is often ready the moment capture ends. Speculations that
+    speech made obsolete are dropped unused.
+
+    The audio is not kept here: ``snapshot(num_bytes)`` (the engine's) copies
+    the start of the recording on a worker thread, so ``feed`` does
+    constant work on the capture thread.
+
+    Speculative uploads count towards ``trace``, but don't mark its stages:
+    they run before the stop, and most are discarded.
+    """
+
+    def __init__(self, transcribe, snapshot, sample_rate, channels, sample_width=2,
+                 silence_seconds=SPECULATIVE_SILENCE_SECONDS, silence_rms=SILENCE_RMS, allowed=None, trace=None):
+        bytes_per_second = sample_rate * channels * sample_width
+        self.transcribe = transcribe
+        self.snapshot = snapshot
+        self.silence_bytes = int(silence_seconds * bytes_per_second)
+        self.min_bytes = int(SPECULATIVE_MIN_SECONDS * bytes_per_second)
+        self.silence_rms = silence_rms
+        self.allowed = allowed
+        self.trace = trace
+        self.captured = 0
+        self.silent_run = 0
+        self.speech_pending = False  # Speech captured since the last speculation
+        self.future = None
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculative")
+        self.speculations = 0
+
+    def feed(self, data):
+        """Feed one captured chunk; only counts it unless it completes a pause"""
+        self.captured += len(data)
+        if chunk_rms(data) >= self.silence_rms:
+            self.silent_run = 0
+            self.speech_pending = True
+            return
+        self.silent_run += len(data)
+        if not self.speech_pending or self.silent_run < self.silence_bytes or self.captured < self.min_bytes:
+            return
+        if self.allowed is not None and not self.allowed():
+            return
+        self.speech_pending = False
+        if self.future is not None:
+            self.future.cancel()  # Only helps if it hasn't started
+        self.speculations += 1
+        self.future = self.executor.submit(metrics.wrap(self._speculate, self.trace, marks=False), self.captured)
+
+    def _speculate(self, num_bytes):
+        audio = self.snapshot(num_bytes)
+        # None: the recording stopped before this ran, and is transcribed normally
+        return self.transcribe(audio) if audio is not None else None
+
+    def finish(self):
+        """Text of the last speculation if no speech came after it, else None"""
+        self.executor.shutdown(wait=False)
+        if self.future is None or self.speech_pending:
+            if self.speculations:
+                print("Speech after the last pause; speculative transcription discarded")
+            return None
+        try:
+            text = self.future.result()
+        except Exception as e:
+            print(f"Speculative transcription error: {e}")
+            return None
+        if text:
+            print("Using the transcription started at the final pause")
+        return text
@@ -0,0 +1,14 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import groq_client  # noqa: E402
+
+
+def test_missing_h2_is_quiet_unless_asked_for(monkeypatch, capsys):
+    monkeypatch.setattr(groq_client, "_http2_available", lambda: False)
+    groq_client.create_http_client(None).close()
+    assert capsys.readouterr().out == ""
+    groq_client.create_http_client(True).close()
+    assert "h2 is not installed" in capsys.readouterr().out
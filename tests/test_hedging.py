@@ -0,0 +1,67 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import metrics  # noqa: E402
+from engines import GroqEngine  # noqa: E402
+from hedging import Hedger  # noqa: E402
+from rate_limiter import RequestScheduler  # noqa: E402
+
+
+class FakeClient:
+    """Groq client stand-in whose first request is slow enough to be hedged"""
+
+    def __init__(self, first_delay):
+        self.first_delay = first_delay
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self.create))
+
+    def create(self, file, **_):
+        with self.lock:
+            self.calls += 1
+            first = self.calls == 1
+        time.sleep(self.first_delay if first else 0.01)
+        return "hello"
+
+
+def transcribe_traced(hedge, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # The uplink estimate is written to the working directory
+    client = FakeClient(first_delay=0.3)
+    engine = GroqEngine(lambda: client, scheduler=RequestScheduler(0, 0), hedge=False)
+    if hedge:
+        engine.hedger = Hedger(engine.scheduler, after=0.05, min_seconds=0.01)
+    pcm = (np.sin(np.arange(16000) / 5) * 8000).astype(np.int16).tobytes()
+    trace = metrics.Trace("test")
+    with trace.active():
+        text = engine.transcribe(pcm, 16000, 1)
+    return text, trace, client
+
+
+def test_upload_bytes_traced_without_hedging(monkeypatch, tmp_path):
+    text, trace, client = transcribe_traced(False, monkeypatch, tmp_path)
+    assert text == "hello"
+    assert client.calls == 1
+    assert trace.upload_bytes > 0
+
+
+def test_upload_bytes_traced_with_hedging(monkeypatch, tmp_path):
+    text, trace, client = transcribe_traced(True, monkeypatch, tmp_path)
+    assert text == "hello"
+    assert client.calls == 2
+    assert trace.upload_bytes > 0
+    assert "request_sent" in trace.marks and "response_received" in trace.marks
+
+
+def test_abandoned_request_does_not_move_marks(monkeypatch, tmp_path):
+    _, trace, _ = transcribe_traced(True, monkeypatch, tmp_path)
+    received = trace.marks["response_received"]
+    time.sleep(0.4)  # Let the slow primary finish
+    assert trace.marks["response_received"] == received
+    assert trace.upload_bytes > 0
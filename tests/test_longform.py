@@ -0,0 +1,67 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from longform import ends_sentence, transcribe_long  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+# 150 s of tone with a pause at 70 s, so it is cut into chunks of 70 and 80 s
+PAUSE_AT = 70
+
+
+def long_pcm(seconds=150):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    signal = np.sin(2 * np.pi * 200 * t) * 8000
+    signal[int((PAUSE_AT - 0.5) * SAMPLE_RATE):int((PAUSE_AT + 0.5) * SAMPLE_RATE)] = 0
+    return signal.astype(np.int16).tobytes()
+
+
+def fake_chunks(first_pass_texts):
+    """transcribe_chunk stand-in: every first pass starts at once, so none has context"""
+    calls = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(first_pass_texts))
+
+    def transcribe_chunk(pcm, context):
+        index = 0 if len(pcm) < (PAUSE_AT + 1) * SAMPLE_RATE * 2 else 1
+        with lock:
+            calls.append((len(pcm), context))
+        if context is None:
+            barrier.wait(timeout=5)
+            return first_pass_texts[index]
+        return f"with context: {context}"
+    return transcribe_chunk, calls
+
+
+def test_ends_sentence():
+    assert ends_sentence("That's it.")
+    assert ends_sentence('He said "stop!" ')
+    assert not ends_sentence("and then we")
+
+
+def test_mid_sentence_boundary_is_retranscribed_with_context():
+    transcribe_chunk, calls = fake_chunks(["one two", "three."])
+    text = transcribe_long(long_pcm(), SAMPLE_RATE, 1, transcribe_chunk, workers=2, repair=True)
+    contexts = [c for _, c in calls if c is not None]
+    assert contexts == ["one two"]
+    assert text == "one two with context: one two"
+
+
+def test_sentence_boundary_is_left_alone():
+    transcribe_chunk, calls = fake_chunks(["one two.", "three."])
+    text = transcribe_long(long_pcm(), SAMPLE_RATE, 1, transcribe_chunk, workers=2, repair=True)
+    assert len(calls) == 2
+    assert text == "one two. three."
+
+
+def test_no_repair_by_default():
+    transcribe_chunk, calls = fake_chunks(["one two", "three."])
+    text = transcribe_long(long_pcm(), SAMPLE_RATE, 1, transcribe_chunk, workers=2)
+    assert len(calls) == 2
+    assert text == "one two three."
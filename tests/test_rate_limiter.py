@@ -0,0 +1,14 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import MIN_BILLED_SECONDS, RequestScheduler  # noqa: E402
+
+
+def test_previews_stop_at_their_share_of_the_audio_budget():
+    scheduler = RequestScheduler(requests_per_minute=0, audio_seconds_per_hour=3600, preview_share=0.25)
+    sent = sum(1 for _ in range(100) if scheduler.try_run(lambda: "preview", 1.5) is not None)
+    assert sent == int(3600 * 0.25 / MIN_BILLED_SECONDS)
+    # The rest of the hour's audio is still there for real requests
+    assert scheduler.audio.level() >= 0.75 - 1e-6
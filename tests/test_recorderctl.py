@@ -0,0 +1,39 @@
+import os
+import socket
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recorderctl  # noqa: E402
+
+
+def run(monkeypatch, path, command="start"):
+    monkeypatch.setattr(recorderctl, "SOCKET_PATH", path)
+    send_command = recorderctl.send_command
+    monkeypatch.setattr(recorderctl, "send_command", lambda command: send_command(command, path, timeout=0.2))
+    monkeypatch.setattr(sys, "argv", ["recorderctl.py", command])
+    return recorderctl.main()
+
+
+def test_missing_socket_is_not_running(monkeypatch, tmp_path):
+    assert run(monkeypatch, str(tmp_path / "missing.sock")) == recorderctl.NOT_RUNNING
+
+
+def test_stale_socket_is_not_running(monkeypatch, tmp_path):
+    path = str(tmp_path / "stale.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.close()  # Like a killed daemon: the file stays, nothing listens
+    assert os.path.exists(path)
+    assert run(monkeypatch, path) == recorderctl.NOT_RUNNING
+
+
+def test_silent_daemon_times_out(monkeypatch, tmp_path):
+    path = str(tmp_path / "busy.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)  # Accepts connections but never replies
+    try:
+        assert run(monkeypatch, path) == 1
+    finally:
+        server.close()
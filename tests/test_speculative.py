@@ -0,0 +1,64 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import metrics  # noqa: E402
+from audio_engine import CaptureBuffer  # noqa: E402
+from streaming import SpeculativeTranscriber  # noqa: E402
+
+SAMPLE_RATE = 16000
+CHUNK = 1600  # 0.1 s
+
+
+def chunks(seconds, loud):
+    tone = (np.sin(np.arange(CHUNK) / 3) * (8000 if loud else 0)).astype(np.int16).tobytes()
+    return [tone] * int(seconds * 10)
+
+
+def fake_transcribe(seen):
+    """Transcriber that reports its request the way the engines do"""
+    def transcribe(audio):
+        metrics.mark("request_sent")
+        metrics.record_request("fake", 0.01, len(audio))
+        seen.append(len(audio))
+        return f"{len(audio)} bytes"
+    return transcribe
+
+
+def run(pattern, trace=None):
+    """Feed (seconds, loud) runs to a speculative transcriber over a shared capture buffer"""
+    buffer = CaptureBuffer(1024)
+    seen = []
+    speculation = SpeculativeTranscriber(
+        fake_transcribe(seen), buffer.copy, SAMPLE_RATE, 1, silence_seconds=0.5, trace=trace,
+    )
+    for seconds, loud in pattern:
+        for chunk in chunks(seconds, loud):
+            buffer.append(chunk)
+            speculation.feed(chunk)
+    return speculation, speculation.finish(), seen
+
+
+def test_pause_at_the_end_is_used():
+    speculation, text, seen = run([(2, True), (1, False)])
+    assert speculation.speculations == 1
+    # Snapshot taken when the pause was complete, not of the whole recording
+    assert text == f"{seen[0]} bytes"
+    assert seen[0] == (2 + 0.5) * SAMPLE_RATE * 2
+
+
+def test_speech_after_the_pause_discards_it():
+    speculation, text, _ = run([(2, True), (1, False), (1, True)])
+    assert speculation.speculations == 1
+    assert text is None
+
+
+def test_speculative_upload_counts_in_the_trace():
+    trace = metrics.Trace("test")
+    _, _, seen = run([(2, True), (1, False)], trace)
+    assert trace.upload_bytes == seen[0]
+    # Sent before the stop, so it must not stand in for the real request's stages
+    assert "request_sent" not in trace.marks
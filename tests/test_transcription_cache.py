@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcription_cache import TranscriptionCache  # noqa: E402
+
+
+class BrokenConnection:
+    """sqlite3 connection stand-in that fails like a locked or damaged database"""
+
+    def execute(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+    executemany = execute
+
+    def close(self):
+        pass
+
+
+def test_round_trip(tmp_path):
+    cache = TranscriptionCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("key") is None
+    cache.put("key", "hello")
+    assert cache.get("key") == "hello"
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_database_errors_never_propagate(tmp_path):
+    cache = TranscriptionCache(str(tmp_path / "cache.sqlite3"))
+    cache.db.close()
+    cache.db = BrokenConnection()
+    assert cache.get("key") is None
+    assert cache.misses == 1
+    cache.put("key", "hello")
+    assert cache.stats()["entries"] is None
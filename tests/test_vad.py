@@ -0,0 +1,78 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+
+from bench_end_to_end import speech_like  # noqa: E402
+from vad import frame_features, keep_mask, speech_mask, trim_silence  # noqa: E402
+
+SAMPLE_RATE = 16000
+FRAME_LEN = 480
+
+
+def samples(pcm):
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+
+
+def to_pcm(signal):
+    return np.int16(np.clip(signal, -32768, 32767)).tobytes()
+
+
+def noisy_speech(seconds, snr_db, gain=1.0):
+    """speech_like with white noise at snr_db below the speech's power, scaled by gain"""
+    speech = samples(speech_like(seconds, SAMPLE_RATE, 1))
+    power = np.mean(speech[speech != 0] ** 2)
+    noise = np.random.default_rng(1).normal(0, np.sqrt(power / 10 ** (snr_db / 10)), len(speech))
+    return to_pcm((speech + noise) * gain)
+
+
+def dense_speech(seconds):
+    """A voiced tone whose loudness dips with every syllable but never pauses"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voice = sum(np.sin(2 * np.pi * 140 * h * t) / h for h in (1, 2, 3))
+    syllables = 1 - 0.45 * (1 + np.sin(2 * np.pi * 4 * t)) / 2
+    return to_pcm(voice * syllables * 6000)
+
+
+def kept_speech(pcm):
+    """Padded speech frames, as trim_silence would keep them"""
+    energy, zcr = frame_features(samples(pcm), FRAME_LEN)
+    return keep_mask(speech_mask(energy, zcr), 7, 33)
+
+
+@pytest.mark.parametrize("snr_db", [8, 5])
+@pytest.mark.parametrize("seconds", [1, 3])
+def test_noisy_speech_is_uploaded(seconds, snr_db):
+    pcm = noisy_speech(seconds, snr_db)
+    assert trim_silence(pcm, SAMPLE_RATE, 1) is not None
+
+
+@pytest.mark.parametrize("snr_db", [8, 5])
+def test_quiet_noisy_speech_is_found(snr_db):
+    # Too quiet overall to be kept untrimmed, so the mask itself has to find the speech
+    clean = kept_speech(speech_like(3, SAMPLE_RATE, 1))
+    found = kept_speech(noisy_speech(3, snr_db, gain=0.1))
+    assert (found & clean).sum() >= 0.9 * clean.sum()
+
+
+@pytest.mark.parametrize("seconds", [1, 3])
+def test_dense_speech_is_kept_whole(seconds):
+    pcm = dense_speech(seconds)
+    assert trim_silence(pcm, SAMPLE_RATE, 1) == pcm
+
+
+def test_pauses_are_still_trimmed():
+    pcm = speech_like(3, SAMPLE_RATE, 1)
+    trimmed = trim_silence(pcm, SAMPLE_RATE, 1)
+    assert trimmed is not None and len(trimmed) < len(pcm)
+
+
+@pytest.mark.parametrize("dbfs", [-90, -50, -40])
+def test_silence_and_steady_noise_are_skipped(dbfs):
+    noise = np.random.default_rng(2).normal(0, 32768 * 10 ** (dbfs / 20), 3 * SAMPLE_RATE)
+    assert trim_silence(to_pcm(noise), SAMPLE_RATE, 1) is None
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Persistent transcription cache keyed on the audio itself
+
+Entries are keyed on a SHA-256 of the preprocessed PCM (after downmix,
+resampling and silence trimming, so a replay of the same recording maps to
+the same key) together with the engine, model, prompt and language. The
+store is one SQLite file shared by every process; least recently used
+entries are evicted once it grows past TRANSCRIPTION_CACHE_MAX_MB.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from config import env_bool, env_float, env_str
+
+TRANSCRIPTION_CACHE = env_bool("TRANSCRIPTION_CACHE", True)
+TRANSCRIPTION_CACHE_PATH = env_str("TRANSCRIPTION_CACHE_PATH", "~/.cache/groq_whisperer/transcriptions.sqlite3")
+TRANSCRIPTION_CACHE_MAX_BYTES = int(env_float("TRANSCRIPTION_CACHE_MAX_MB", 50) * 1024 * 1024)
+
+# Eviction fetches the least recently used entries in batches of this many
+EVICT_BATCH = 256
+
+
+def audio_key(data, sample_rate, channels, signature):
+    """Hex digest identifying one clip transcribed with one engine configuration"""
+    digest = hashlib.sha256()
+    digest.update(f"{signature}\0{sample_rate}\0{channels}\0".encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """SQLite-backed LRU map from audio key to transcript, with hit and miss counters"""
+
+    def __init__(self, path=TRANSCRIPTION_CACHE_PATH, max_bytes=TRANSCRIPTION_CACHE_MAX_BYTES):
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")  # The daemon and one-shot runs can share it
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS transcriptions ("
+            " key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS transcriptions_used ON transcriptions (used)")
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Cached text for a key, or None; a failing store counts as a miss"""
+        with self.lock:
+            try:
+                row = self.db.execute("SELECT text FROM transcriptions WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"Warning: Transcription cache lookup failed: {e}")
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            try:
+                self.db.execute("UPDATE transcriptions SET used = ? WHERE key = ?", (time.time(), key))
+            except sqlite3.Error as e:
+                print(f"Warning: Could not update transcription cache: {e}")
+            return row[0]
+
+    def put(self, key, text):
+        """Store a transcript, evicting the least recently used entries if over size
+
+        Failures (another process holding the lock, a damaged file) are
+        logged and skipped: the cache must never fail a transcription.
+        """
+        now = time.time()
+        with self.lock:
+            try:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO transcriptions (key, text, size, created, used) VALUES (?, ?, ?, ?, ?)",
+                    (key, text, len(key) + len(text.encode()), now, now),
+                )
+                self._evict()
+            except sqlite3.Error as e:
+                print(f"Warning: Could not update transcription cache: {e}")
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM transcriptions").fetchone()[0]
+        while total > self.max_bytes:
+            rows = self.db.execute(
+                "SELECT key, size FROM transcriptions ORDER BY used LIMIT ?", (EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                return
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+            self.db.executemany("DELETE FROM transcriptions WHERE key = ?", victims)
+
+    def stats(self):
+        """Hit/miss counters for this process plus the size of the shared store"""
+        with self.lock:
+            try:
+                entries, size = self.db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcriptions"
+                ).fetchone()
+            except sqlite3.Error:
+                entries, size = None, None
+            return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def open_cache():
+    """The configured cache, or None when it is disabled or can't be opened"""
+    if not TRANSCRIPTION_CACHE:
+        return None
+    try:
+        return TranscriptionCache()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: Transcription cache unavailable ({e}); continuing without it")
+        return None
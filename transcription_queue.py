@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import env_int
+
+# Recordings transcribed at the same time
+TRANSCRIBE_WORKERS = env_int("TRANSCRIBE_WORKERS", 2)
+
+
+class TranscriptionQueue:
+    """Transcribe finished recordings in the background, delivering results in recording order
+
+    ``process`` runs on a pool of ``workers`` threads and turns one submitted
+    recording into text (or None). ``deliver`` is called with each result on
+    a single delivery thread, strictly in the order recordings were submitted,
+    so a slow request holds back later results instead of reordering them.
+    """
+
+    def __init__(self, process, deliver, workers=TRANSCRIBE_WORKERS):
+        self.process = process
+        self.deliver = deliver
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="transcribe")
+        self.pending = queue.Queue()
+        self.delivery = threading.Thread(target=self._deliver_in_order, name="deliver")
+        self.delivery.daemon = True
+        self.delivery.start()
+
+    def submit(self, recording):
+        """Queue a recording; returns immediately"""
+        self.pending.put(self.executor.submit(self.process, recording))
+
+    def _deliver_in_order(self):
+        while True:
+            future = self.pending.get()
+            if future is None:
+                return
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"\nTranscription worker error: {e}")
+                result = None
+            try:
+                self.deliver(result)
+            except Exception as e:
+                print(f"\nError delivering transcription: {e}")
+
+    def close(self, wait=True):
+        """Stop accepting work; with wait, deliver everything already queued first"""
+        self.pending.put(None)
+        if wait:
+            self.delivery.join()
+        self.executor.shutdown(wait=wait)
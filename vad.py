@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+import numpy as np
+
+from audio_processing import pcm_to_array
+from config import env_bool, env_float
+
+VAD_ENABLED = env_bool("VAD_ENABLED", True)
+
+# Analysis frame length
+FRAME_SECONDS = 0.03
+
+# A frame is speech when it is this far above the noise floor...
+THRESHOLD_DB = env_float("VAD_THRESHOLD_DB", 10.0)
+# ...and never quieter than this, so a silent clip isn't measured against itself
+MIN_DBFS = env_float("VAD_MIN_DBFS", -45.0)
+# ...but never more than this far below the clip's peak, so in noisy or wall-to-wall
+# speech, where the quietest frames are speech too, the speech isn't its own floor...
+PEAK_RANGE_DB = 15.0
+# ...yet at least this far above the floor, since a steady noise's peak is close to it
+MIN_RISE_DB = 5.0
+# Frames this loud are speech whatever the noise floor
+SPEECH_DBFS = env_float("VAD_SPEECH_DBFS", -25.0)
+# A clip this far above MIN_DBFS overall is never skipped, only left untrimmed
+KEEP_ABOVE_MIN_DB = 10.0
+# Quieter frames still count when they look like fricatives (s, f, sh)
+FRICATIVE_MARGIN_DB = 6.0
+FRICATIVE_ZCR = 0.3
+
+# Silence kept around speech so word edges aren't clipped
+PADDING_SECONDS = env_float("VAD_PADDING_SECONDS", 0.2)
+# Internal pauses longer than this are shortened to this length
+MAX_PAUSE_SECONDS = env_float("VAD_MAX_PAUSE_SECONDS", 1.0)
+# Less speech than this and the upload is skipped
+MIN_SPEECH_SECONDS = env_float("VAD_MIN_SPEECH_SECONDS", 0.3)
+
+
+def frame_features(mono, frame_len):
+    """Per-frame energy (dBFS) and zero-crossing rate"""
+    n_frames = len(mono) // frame_len
+    frames = mono[:n_frames * frame_len].reshape(n_frames, frame_len) / 32768.0
+    energy = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return energy, zcr
+
+
+def speech_mask(energy, zcr, threshold_db=THRESHOLD_DB, min_dbfs=MIN_DBFS):
+    """Boolean array marking frames that contain speech"""
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool)
+    noise_floor = np.percentile(energy, 10)
+    cap = max(energy.max() - PEAK_RANGE_DB, noise_floor + MIN_RISE_DB)
+    threshold = max(min_dbfs, min(noise_floor + threshold_db, cap))
+    voiced = (energy > threshold) | (energy > SPEECH_DBFS)
+    if threshold < noise_floor + threshold_db:
+        # This close to the noise floor, noise crosses zero as often as a fricative
+        return voiced
+    fricative = (energy > threshold - FRICATIVE_MARGIN_DB) & (zcr > FRICATIVE_ZCR)
+    return voiced | fricative
+
+
+def _dilate(mask, radius):
+    """Grow every speech region by radius frames on each side"""
+    if radius <= 0 or not mask.any():
+        return mask
+    kernel = np.ones(2 * radius + 1, dtype=np.int32)
+    return np.convolve(mask.astype(np.int32), kernel, mode="same") > 0
+
+
+def keep_mask(mask, padding_frames, max_pause_frames):
+    """Frames to keep: padded speech with long internal pauses shortened"""
+    keep = _dilate(mask, padding_frames)
+    if not keep.any():
+        return keep
+
+    # Drop leading and trailing silence entirely
+    speech = np.flatnonzero(keep)
+    keep[:speech[0]] = False
+    keep[speech[-1] + 1:] = False
+
+    # Run-length encode the remaining gaps and keep only max_pause of each
+    edges = np.diff(np.concatenate(([1], keep[speech[0]:speech[-1] + 1].astype(np.int8), [1])))
+    starts = np.flatnonzero(edges == -1) + speech[0]
+    ends = np.flatnonzero(edges == 1) + speech[0]
+    for start, end in zip(starts, ends):
+        if end - start > max_pause_frames:
+            half = max_pause_frames // 2
+            keep[start + half:end - (max_pause_frames - half)] = False
+            keep[start:start + half] = True
+            keep[end - (max_pause_frames - half):end] = True
+    return keep
+
+
+def trim_silence(data, sample_rate, channels,
+                 padding_seconds=PADDING_SECONDS, max_pause_seconds=MAX_PAUSE_SECONDS,
+                 min_speech_seconds=MIN_SPEECH_SECONDS):
+    """Trim leading/trailing silence and collapse long pauses in 16-bit PCM
+
+    Returns the trimmed PCM bytes, the input untouched when it is clearly
+    loud but no speech was found in it, or None when no speech was detected.
+    """
+    samples = pcm_to_array(data, channels)
+    mono = samples.mean(axis=1, dtype=np.float32)
+    frame_len = max(1, int(FRAME_SECONDS * sample_rate))
+
+    energy, zcr = frame_features(mono, frame_len)
+    mask = speech_mask(energy, zcr)
+    if mask.sum() * FRAME_SECONDS < min_speech_seconds:
+        rms = 10 * np.log10(np.mean((mono / 32768.0) ** 2) + 1e-10)
+        return data if rms > MIN_DBFS + KEEP_ABOVE_MIN_DB else None
+
+    keep = keep_mask(
+        mask,
+        int(round(padding_seconds / FRAME_SECONDS)),
+        int(round(max_pause_seconds / FRAME_SECONDS)),
+    )
+    # Expand the frame mask to samples; the partial last frame follows its neighbour
+    sample_keep = np.repeat(keep, frame_len)
+    tail = len(samples) - len(sample_keep)
+    if tail:
+        sample_keep = np.concatenate([sample_keep, np.full(tail, keep[-1])])
+    return samples[sample_keep].tobytes()
+
+
+def apply_vad(data, sample_rate, channels):
+    """Trim silence when VAD is enabled; None means skip the upload"""
+    if not VAD_ENABLED:
+        return data
+    trimmed = trim_silence(data, sample_rate, channels)
+    if trimmed is None:
+        print("No speech detected, skipping upload.")
+    else:
+        before = len(data) / (sample_rate * channels * 2)
+        after = len(trimmed) / (sample_rate * channels * 2)
+        print(f"Trimmed silence: {before:.1f}s -> {after:.1f}s")
+    return trimmed